@@ -0,0 +1 @@
+"""Benchmarks of the Devialet package against emulated speakers."""
@@ -0,0 +1,411 @@
+"""Emulated Devialet speakers for benchmarking.
+
+Every speaker listens on its own loopback address (127.0.x.y), so the
+SSDP registry can tell them apart by host. Linux routes all of 127.0.0.0/8
+to the loopback interface, other platforms need aliases for these addresses.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import itertools
+import random
+import socket
+from xml.sax.saxutils import escape
+
+import aiohttp
+from aiohttp import web
+
+from devialet.const import AV_TRANSPORT, MEDIA_RENDERER, UrlSuffix
+
+DESCRIPTION_PATH = "/description.xml"
+SCPD_PATH = "/AVTransport.xml"
+CONTROL_PATH = "/AVTransport/control"
+EVENT_PATH = "/AVTransport/event"
+SUBSCRIPTION_TIMEOUT = 1800
+SSDP_BURST = 20
+
+DESCRIPTION_XML = """<?xml version="1.0"?>
+<root xmlns="urn:schemas-upnp-org:device-1-0">
+<specVersion><major>1</major><minor>0</minor></specVersion>
+<device>
+<deviceType>{device_type}</deviceType>
+<friendlyName>{name}</friendlyName>
+<manufacturer>Devialet</manufacturer>
+<modelName>Phantom I</modelName>
+<UDN>uuid:{device_id}</UDN>
+<serviceList><service>
+<serviceType>{service_type}</serviceType>
+<serviceId>urn:upnp-org:serviceId:AVTransport</serviceId>
+<SCPDURL>{scpd_path}</SCPDURL>
+<controlURL>{control_path}</controlURL>
+<eventSubURL>{event_path}</eventSubURL>
+</service></serviceList>
+</device>
+</root>"""
+
+SCPD_XML = """<?xml version="1.0"?>
+<scpd xmlns="urn:schemas-upnp-org:service-1-0">
+<specVersion><major>1</major><minor>0</minor></specVersion>
+<actionList>
+<action><name>SetAVTransportURI</name><argumentList>
+<argument><name>InstanceID</name><direction>in</direction><relatedStateVariable>A_ARG_TYPE_InstanceID</relatedStateVariable></argument>
+<argument><name>CurrentURI</name><direction>in</direction><relatedStateVariable>AVTransportURI</relatedStateVariable></argument>
+<argument><name>CurrentURIMetaData</name><direction>in</direction><relatedStateVariable>AVTransportURIMetaData</relatedStateVariable></argument>
+</argumentList></action>
+<action><name>Play</name><argumentList>
+<argument><name>InstanceID</name><direction>in</direction><relatedStateVariable>A_ARG_TYPE_InstanceID</relatedStateVariable></argument>
+<argument><name>Speed</name><direction>in</direction><relatedStateVariable>TransportPlaySpeed</relatedStateVariable></argument>
+</argumentList></action>
+</actionList>
+<serviceStateTable>
+<stateVariable sendEvents="no"><name>A_ARG_TYPE_InstanceID</name><dataType>ui4</dataType></stateVariable>
+<stateVariable sendEvents="no"><name>AVTransportURI</name><dataType>string</dataType></stateVariable>
+<stateVariable sendEvents="no"><name>AVTransportURIMetaData</name><dataType>string</dataType></stateVariable>
+<stateVariable sendEvents="no"><name>TransportPlaySpeed</name><dataType>string</dataType></stateVariable>
+<stateVariable sendEvents="no"><name>TransportState</name><dataType>string</dataType></stateVariable>
+<stateVariable sendEvents="no"><name>CurrentTrackMetaData</name><dataType>string</dataType></stateVariable>
+<stateVariable sendEvents="yes"><name>LastChange</name><dataType>string</dataType></stateVariable>
+</serviceStateTable>
+</scpd>"""
+
+SOAP_RESPONSE = """<?xml version="1.0"?>
+<s:Envelope xmlns:s="http://schemas.xmlsoap.org/soap/envelope/" s:encodingStyle="http://schemas.xmlsoap.org/soap/encoding/">
+<s:Body><u:{action}Response xmlns:u="{service_type}"></u:{action}Response></s:Body>
+</s:Envelope>"""
+
+LAST_CHANGE = (
+    '<Event xmlns="urn:schemas-upnp-org:metadata-1-0/AVT/"><InstanceID val="0">'
+    '<TransportState val="{transport_state}"/></InstanceID></Event>'
+)
+PROPERTY_SET = """<?xml version="1.0"?>
+<e:propertyset xmlns:e="urn:schemas-upnp-org:event-1-0">
+<e:property><LastChange>{last_change}</LastChange></e:property>
+</e:propertyset>"""
+
+
+class EmulatedSpeaker:
+    """State and behaviour of one emulated speaker."""
+
+    def __init__(
+        self,
+        index: int,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        payload_size: int = 0,
+        failure_rate: float = 0.0,
+    ):
+        """Initialize the speaker."""
+        self.address = f"127.0.{1 + index // 250}.{1 + index % 250}"
+        self.device_id = f"emulated-{index:04d}"
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.requests = 0
+        self.subscriptions = {}
+        self.volume = 30
+        self.night_mode = "off"
+        self.playing_state = "playing"
+        self.mute_state = "unmuted"
+        self.position = 0
+        self.padding = "x" * payload_size
+        self.general_info = {
+            "deviceId": self.device_id,
+            "deviceName": f"Phantom {index}",
+            "groupId": f"group-{index // 2}",
+            "isSystemLeader": index % 2 == 0,
+            "model": "Phantom I",
+            "role": "FrontLeft" if index % 2 == 0 else "FrontRight",
+            "serial": f"S{index:08d}",
+            "systemId": f"system-{index // 2}",
+            "release": {"version": "2.16.1"},
+        }
+        self.sources = {
+            "sources": [
+                {"sourceId": f"{self.device_id}-optical", "deviceId": self.device_id, "type": "optical"},
+                {"sourceId": f"{self.device_id}-spotify", "deviceId": self.device_id, "type": "spotifyconnect"},
+                {"sourceId": f"{self.device_id}-airplay", "deviceId": self.device_id, "type": "airplay2"},
+                {"sourceId": f"{self.device_id}-upnp", "deviceId": self.device_id, "type": "upnp"},
+            ]
+        }
+
+    def current_source(self) -> dict:
+        """Return the current source state."""
+        return {
+            "source": self.sources["sources"][1],
+            "playingState": self.playing_state,
+            "muteState": self.mute_state,
+            "availableOperations": ["play", "pause", "next", "previous", "seek"],
+            "metadata": {
+                "title": "Emulated track",
+                "artist": "Emulated artist",
+                "album": "Emulated album",
+                "coverArtUrl": "",
+                "duration": 240,
+                "padding": self.padding,
+            },
+        }
+
+    def get(self, path: str) -> dict | None:
+        """Return the response of a GET endpoint."""
+        if path == str(UrlSuffix.GET_GENERAL_INFO):
+            return self.general_info
+        if path == str(UrlSuffix.GET_SOURCES):
+            return self.sources
+        if path == str(UrlSuffix.GET_CURRENT_SOURCE):
+            return self.current_source()
+        if path == str(UrlSuffix.GET_VOLUME):
+            return {"volume": self.volume}
+        if path == str(UrlSuffix.GET_NIGHT_MODE):
+            return {"nightMode": self.night_mode}
+        if path == str(UrlSuffix.GET_EQUALIZER):
+            return {"enabled": True, "preset": "flat"}
+        if path == str(UrlSuffix.GET_CURRENT_POSITION):
+            return {"position": self.position}
+        return None
+
+    def post(self, path: str, body: dict) -> None:
+        """Apply a command."""
+        if path == str(UrlSuffix.VOLUME_SET):
+            self.volume = body.get("volume", self.volume)
+        elif path == str(UrlSuffix.VOLUME_UP):
+            self.volume = min(self.volume + 1, 100)
+        elif path == str(UrlSuffix.VOLUME_DOWN):
+            self.volume = max(self.volume - 1, 0)
+        elif path == str(UrlSuffix.NIGHT_MODE):
+            self.night_mode = body.get("nightMode", self.night_mode)
+        elif path == str(UrlSuffix.PLAY):
+            self.playing_state = "playing"
+        elif path == str(UrlSuffix.PAUSE):
+            self.playing_state = "paused"
+        elif path == str(UrlSuffix.MUTE):
+            self.mute_state = "muted"
+        elif path == str(UrlSuffix.UNMUTE):
+            self.mute_state = "unmuted"
+        elif path == str(UrlSuffix.SEEK):
+            self.position = body.get("position", self.position)
+
+    def property_set(self) -> str:
+        """Return the body of an event with the transport state."""
+        transport_state = "PLAYING" if self.playing_state == "playing" else "PAUSED_PLAYBACK"
+        return PROPERTY_SET.format(
+            last_change=escape(LAST_CHANGE.format(transport_state=transport_state))
+        )
+
+    async def async_delay(self) -> None:
+        """Wait for the configured latency and jitter."""
+        delay = self.latency + random.uniform(0, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def fails(self) -> bool:
+        """Return True when this request has to fail."""
+        return self.failure_rate > 0 and random.random() < self.failure_rate
+
+
+class SsdpResponder(asyncio.DatagramProtocol):
+    """Answer M-SEARCH requests with the locations of all speakers."""
+
+    def __init__(self, emulator: DevialetEmulator):
+        """Initialize the responder."""
+        self._emulator = emulator
+        self._transport: asyncio.DatagramTransport | None = None
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        """Store the transport."""
+        self._transport = transport
+
+    def datagram_received(self, data: bytes, addr: tuple) -> None:
+        """Answer a search request."""
+        if data.startswith(b"M-SEARCH"):
+            asyncio.ensure_future(self._async_respond(addr))
+
+    async def _async_respond(self, addr: tuple) -> None:
+        """Send a search response for every speaker."""
+        for index, speaker in enumerate(self._emulator.speakers):
+            # Yield now and then, a burst of a thousand datagrams overflows the receive buffer
+            if index and index % SSDP_BURST == 0:
+                await asyncio.sleep(0.002)
+            response = (
+                "HTTP/1.1 200 OK\r\n"
+                "CACHE-CONTROL: max-age=1800\r\n"
+                "EXT:\r\n"
+                f"LOCATION: http://{speaker.address}:{self._emulator.port}{DESCRIPTION_PATH}\r\n"
+                "SERVER: Emulator/1.0 UPnP/1.0 Devialet/1.0\r\n"
+                f"ST: {MEDIA_RENDERER}\r\n"
+                f"USN: uuid:{speaker.device_id}::{MEDIA_RENDERER}\r\n"
+                "BOOTID.UPNP.ORG: 1\r\n"
+                "CONFIGID.UPNP.ORG: 1\r\n"
+                "\r\n"
+            )
+            self._transport.sendto(response.encode(), addr)
+
+
+class DevialetEmulator:
+    """Serve the IP control API, the UPnP descriptions and SSDP for many speakers."""
+
+    def __init__(self, count: int, **speaker_options):
+        """Initialize the emulator, options are passed to every speaker."""
+        self.speakers = [EmulatedSpeaker(index, **speaker_options) for index in range(count)]
+        self._by_address = {speaker.address: speaker for speaker in self.speakers}
+        self.port = 0
+        self.ssdp_address: tuple | None = None
+        self._runner: web.AppRunner | None = None
+        self._ssdp_transport: asyncio.DatagramTransport | None = None
+        self._session: aiohttp.ClientSession | None = None
+        self._sids = itertools.count(1)
+        self._notify_tasks = set()
+
+    @property
+    def hosts(self) -> list:
+        """Return the hosts to pass to DevialetApi."""
+        return [f"{speaker.address}:{self.port}" for speaker in self.speakers]
+
+    @property
+    def requests(self) -> int:
+        """Return the number of HTTP requests served."""
+        return sum(speaker.requests for speaker in self.speakers)
+
+    async def __aenter__(self) -> DevialetEmulator:
+        """Start the emulator."""
+        await self.async_start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        """Stop the emulator."""
+        await self.async_stop()
+
+    async def async_start(self) -> None:
+        """Start the HTTP servers and the SSDP responder."""
+        self._session = aiohttp.ClientSession()
+        app = web.Application()
+        app.router.add_route("*", "/{path:.*}", self._async_handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+
+        # All speakers share one port number, each on its own address
+        with socket.socket() as sock:
+            sock.bind((self.speakers[0].address, 0))
+            self.port = sock.getsockname()[1]
+        for speaker in self.speakers:
+            await web.TCPSite(self._runner, speaker.address, self.port).start()
+
+        loop = asyncio.get_running_loop()
+        self._ssdp_transport, _ = await loop.create_datagram_endpoint(
+            lambda: SsdpResponder(self), local_addr=("127.0.0.1", 0)
+        )
+        self.ssdp_address = self._ssdp_transport.get_extra_info("sockname")
+
+    async def async_stop(self) -> None:
+        """Stop the emulator."""
+        if self._ssdp_transport is not None:
+            self._ssdp_transport.close()
+        for task in self._notify_tasks:
+            task.cancel()
+        if self._session is not None:
+            await self._session.close()
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def _async_handle(self, request: web.Request) -> web.StreamResponse:
+        """Dispatch a request to the speaker of the local address."""
+        speaker = self._by_address.get(request.transport.get_extra_info("sockname")[0])
+        if speaker is None:
+            raise web.HTTPNotFound()
+        speaker.requests += 1
+        await speaker.async_delay()
+
+        path = request.path
+        if path == DESCRIPTION_PATH:
+            return web.Response(
+                text=DESCRIPTION_XML.format(
+                    device_type=MEDIA_RENDERER,
+                    name=speaker.general_info["deviceName"],
+                    device_id=speaker.device_id,
+                    service_type=AV_TRANSPORT,
+                    scpd_path=SCPD_PATH,
+                    control_path=CONTROL_PATH,
+                    event_path=EVENT_PATH,
+                ),
+                content_type="text/xml",
+            )
+        if path == SCPD_PATH:
+            return web.Response(text=SCPD_XML, content_type="text/xml")
+        if path == EVENT_PATH:
+            return self._handle_subscription(speaker, request)
+        if path == CONTROL_PATH:
+            action = request.headers.get("SOAPACTION", "").strip('"').split("#")[-1]
+            return web.Response(
+                text=SOAP_RESPONSE.format(action=action, service_type=AV_TRANSPORT),
+                content_type="text/xml",
+            )
+
+        if speaker.fails():
+            return web.json_response({"error": {"code": "SystemError"}}, status=500)
+
+        if request.method == "POST":
+            body = {}
+            if request.can_read_body:
+                try:
+                    body = await request.json()
+                except json.JSONDecodeError:
+                    pass
+            playing_state = speaker.playing_state
+            speaker.post(path, body)
+            if speaker.playing_state != playing_state:
+                self._notify(speaker)
+            return web.json_response({})
+
+        data = speaker.get(path)
+        if data is None:
+            return web.json_response({"error": {"code": "NotFound"}}, status=404)
+        return web.json_response(data)
+
+    def _handle_subscription(self, speaker: EmulatedSpeaker, request: web.Request) -> web.Response:
+        """Handle the GENA subscribe, renew and unsubscribe requests."""
+        sid = request.headers.get("SID")
+        if request.method == "UNSUBSCRIBE":
+            speaker.subscriptions.pop(sid, None)
+            return web.Response()
+        if request.method != "SUBSCRIBE":
+            raise web.HTTPMethodNotAllowed(request.method, ["SUBSCRIBE", "UNSUBSCRIBE"])
+
+        if sid is None:
+            sid = f"uuid:{speaker.device_id}-{next(self._sids)}"
+            speaker.subscriptions[sid] = [
+                request.headers.get("CALLBACK", "").strip("<>"),
+                itertools.count(),
+            ]
+            # The initial event follows the response
+            asyncio.get_running_loop().call_soon(self._notify, speaker, sid)
+        elif sid not in speaker.subscriptions:
+            raise web.HTTPPreconditionFailed()
+        return web.Response(headers={"SID": sid, "TIMEOUT": f"Second-{SUBSCRIPTION_TIMEOUT}"})
+
+    def _notify(self, speaker: EmulatedSpeaker, sid: str | None = None) -> None:
+        """Send the transport state to the subscribers of a speaker."""
+        for subscription_id in [sid] if sid else list(speaker.subscriptions):
+            task = asyncio.ensure_future(self._async_notify(speaker, subscription_id))
+            self._notify_tasks.add(task)
+            task.add_done_callback(self._notify_tasks.discard)
+
+    async def _async_notify(self, speaker: EmulatedSpeaker, sid: str) -> None:
+        """Send an event to one subscriber."""
+        subscription = speaker.subscriptions.get(sid)
+        if subscription is None:
+            return
+        callback_url, sequence = subscription
+        headers = {
+            "NT": "upnp:event",
+            "NTS": "upnp:propchange",
+            "SID": sid,
+            "SEQ": str(next(sequence)),
+            "Content-Type": 'text/xml; charset="utf-8"',
+        }
+        try:
+            async with self._session.request(
+                "NOTIFY", callback_url, data=speaker.property_set(), headers=headers
+            ):
+                pass
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            speaker.subscriptions.pop(sid, None)
@@ -0,0 +1,232 @@
+"""Run the benchmarks against emulated speakers.
+
+Usage: python -m benchmarks.run [--speakers 1 10 100 1000] [--json]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import json
+import statistics
+import time
+import tracemalloc
+from urllib.parse import urlsplit
+
+from async_upnp_client.profiles.dlna import DmrDevice
+
+from devialet import DevialetFleet
+from devialet.discovery import UpnpDescriptionCache, UpnpDiscoveryRegistry
+
+from .emulator import DevialetEmulator
+
+SPEAKER_COUNTS = (1, 10, 100, 1000)
+UPDATE_CYCLES = 5
+COMMANDS_PER_SPEAKER = 10
+SEARCH_TIMEOUT = 2
+
+
+def _percentile(values: list, percentile: float) -> float | None:
+    """Return a percentile of the values, None when there are none."""
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(int(len(values) * percentile), len(values) - 1)]
+
+
+def _latency_summary(values: list) -> dict:
+    """Return the latency percentiles in milliseconds."""
+    if not values:
+        return {"p50": None, "p95": None, "max": None}
+    return {
+        "p50": round(statistics.median(values) * 1000, 2),
+        "p95": round(_percentile(values, 0.95) * 1000, 2),
+        "max": round(max(values) * 1000, 2),
+    }
+
+
+async def async_benchmark_updates(emulator: DevialetEmulator, cycles: int, **api_options) -> dict:
+    """Measure the update latency, CPU time and memory per speaker."""
+    samples = []
+
+    def _on_sample(sample) -> None:
+        if sample.endpoint == "update":
+            samples.append(sample.latency)
+
+    gc.collect()
+    tracemalloc.start()
+    async with DevialetFleet(
+        max_concurrent_updates=len(emulator.speakers),
+        update_jitter=0,
+        metrics_hook=_on_sample,
+        **api_options,
+    ) as fleet:
+        for host in emulator.hosts:
+            fleet.add_host(host)
+
+        # The first cycle fetches the general info and the sources of every speaker
+        await fleet.async_update()
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        first_cycle = fleet.last_cycle_duration
+
+        samples.clear()
+        requests = emulator.requests
+        cycle_durations = []
+        cpu_started = time.process_time()
+        for _ in range(cycles):
+            await fleet.async_update()
+            cycle_durations.append(fleet.last_cycle_duration)
+        cpu = time.process_time() - cpu_started
+
+        count = len(emulator.speakers)
+        return {
+            "available": len(fleet.available_hosts),
+            "first_cycle_ms": round(first_cycle * 1000, 2),
+            "cycle_ms": _latency_summary(cycle_durations),
+            "update_ms": _latency_summary(samples),
+            "requests_per_update": round((emulator.requests - requests) / (count * cycles), 2),
+            "cpu_ms_per_update": round(cpu * 1000 / (count * cycles), 3),
+            "memory_kib_per_speaker": round(memory / 1024 / count, 1),
+        }
+
+
+async def async_benchmark_commands(emulator: DevialetEmulator, commands: int, **api_options) -> dict:
+    """Measure the command throughput of all speakers together."""
+    async with DevialetFleet(update_jitter=0, **api_options) as fleet:
+        apis = [fleet.add_host(host) for host in emulator.hosts]
+
+        async def _async_send(api) -> None:
+            for index in range(commands):
+                if index % 2:
+                    await api.async_media_pause()
+                else:
+                    await api.async_media_play()
+
+        started = time.monotonic()
+        await asyncio.gather(*(_async_send(api) for api in apis))
+        elapsed = time.monotonic() - started
+
+        latencies = [
+            stats.latency_sum / stats.count
+            for api in apis
+            for endpoint, stats in api.metrics.endpoints.items()
+            if endpoint.startswith("POST") and stats.count
+        ]
+        total = commands * len(apis)
+        return {
+            "commands": total,
+            "commands_per_second": round(total / elapsed, 1),
+            "command_ms": _latency_summary(latencies),
+        }
+
+
+async def async_benchmark_discovery(emulator: DevialetEmulator) -> dict:
+    """Measure the SSDP search and the UPnP description fetches of all speakers."""
+    registry = UpnpDiscoveryRegistry(search_timeout=SEARCH_TIMEOUT, target=emulator.ssdp_address)
+    hostnames = [urlsplit("http://" + host).hostname for host in emulator.hosts]
+
+    started = time.monotonic()
+    locations = await asyncio.gather(*(registry.async_get_location(host) for host in hostnames))
+    search = time.monotonic() - started
+
+    cache = UpnpDescriptionCache()
+    found = [location for location in locations if location is not None]
+    started = time.monotonic()
+    devices = await asyncio.gather(
+        *(cache.async_get_device(location, registry.get(urlsplit(location).hostname).headers)
+          for location in found),
+        return_exceptions=True,
+    )
+    descriptions = time.monotonic() - started
+    devices = [device for device in devices if not isinstance(device, Exception)]
+
+    # The cached devices are shared, a second round must not fetch anything
+    requests = emulator.requests
+    started = time.monotonic()
+    await asyncio.gather(
+        *(cache.async_get_device(location, registry.get(urlsplit(location).hostname).headers)
+          for location in found)
+    )
+    cached = time.monotonic() - started
+    cached_requests = emulator.requests - requests
+
+    started = time.monotonic()
+    for device in devices[:10]:
+        dmr_device = DmrDevice(device, None)
+        await dmr_device.async_set_transport_uri("http://127.0.0.1/stream.mp3", "Benchmark")
+        await dmr_device.async_play()
+    upnp_play = (time.monotonic() - started) / min(len(devices), 10) if devices else None
+
+    return {
+        "found": len(found),
+        "devices": len(devices),
+        "search_ms": round(search * 1000, 2),
+        "descriptions_ms": round(descriptions * 1000, 2),
+        "cached_descriptions_ms": round(cached * 1000, 2),
+        "cached_description_requests": cached_requests,
+        "upnp_play_ms": None if upnp_play is None else round(upnp_play * 1000, 2),
+    }
+
+
+async def async_run(args: argparse.Namespace) -> dict:
+    """Run all benchmarks for every speaker count."""
+    results = {}
+    api_options = {
+        "concurrent_update": args.concurrent_update,
+        "select_response_fields": args.select_response_fields,
+        "group_polling": args.group_polling,
+        "hedge_requests": args.hedge_requests,
+    }
+    for count in args.speakers:
+        async with DevialetEmulator(
+            count,
+            latency=args.latency,
+            jitter=args.jitter,
+            payload_size=args.payload_size,
+            failure_rate=args.failure_rate,
+        ) as emulator:
+            results[count] = {
+                "update": await async_benchmark_updates(emulator, args.cycles, **api_options),
+                "commands": await async_benchmark_commands(emulator, args.commands, **api_options),
+                "discovery": await async_benchmark_discovery(emulator),
+            }
+    return results
+
+
+def _print_results(results: dict) -> None:
+    """Print the results as a table per benchmark."""
+    for count, benchmarks in results.items():
+        print(f"{count} speaker(s)")
+        for name, values in benchmarks.items():
+            print(f"  {name}")
+            for key, value in values.items():
+                print(f"    {key:30} {value}")
+
+
+def main() -> None:
+    """Parse the arguments and run the benchmarks."""
+    parser = argparse.ArgumentParser(description="Benchmark the Devialet package against emulated speakers")
+    parser.add_argument("--speakers", type=int, nargs="+", default=SPEAKER_COUNTS)
+    parser.add_argument("--cycles", type=int, default=UPDATE_CYCLES)
+    parser.add_argument("--commands", type=int, default=COMMANDS_PER_SPEAKER)
+    parser.add_argument("--latency", type=float, default=0.0, help="response latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random extra latency in seconds")
+    parser.add_argument("--payload-size", type=int, default=0, help="padding added to the metadata")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of failing requests")
+    parser.add_argument("--concurrent-update", action="store_true")
+    parser.add_argument("--select-response-fields", action="store_true")
+    parser.add_argument("--group-polling", action="store_true")
+    parser.add_argument("--hedge-requests", action="store_true")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(async_run(args))
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        _print_results(results)
+
+
+if __name__ == "__main__":
+    main()
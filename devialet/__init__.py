@@ -1,2 +1,15 @@
 """The Devialet integration."""
 from devialet.devialet_api import DevialetApi 
+from devialet.scheduler import PollScheduler
+from devialet.fleet import DevialetFleet
+from devialet.group import CommandResult, GroupCoordinator, async_group_command
+from devialet.events import UpnpEventListener
+from devialet.cover_art import CoverArt, CoverArtCache
+from devialet.icy import IcyMetadataCache, IcyStreamReader
+from devialet.state import DevialetState
+from devialet.coalescer import CommandCoalescer
+from devialet.request_queue import RequestQueue
+from devialet.watch import ChangeEvent, ChangeKind, Track
+from devialet.scanner import DevialetScanner, DiscoveredDevice, DiscoveredSystem
+from devialet.circuit_breaker import CircuitBreaker
+from devialet.metrics import DevialetMetrics, MetricSample
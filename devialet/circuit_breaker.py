@@ -0,0 +1,102 @@
+"""Circuit breaker for offline Devialet devices."""
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from typing import Callable
+
+BACKOFF_BASE = 2
+BACKOFF_MAX = 60
+FAILURE_THRESHOLD = 2
+PROBE_TIMEOUT = 0.5
+
+
+class CircuitBreaker:
+    """Stop sending requests to a host that does not answer, probe it with backoff.
+
+    A successful probe half-opens the circuit for one update, only an update
+    that reaches the device closes it again.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = FAILURE_THRESHOLD,
+        backoff_base: float = BACKOFF_BASE,
+        backoff_max: float = BACKOFF_MAX,
+        probe_timeout: float = PROBE_TIMEOUT,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initialize the circuit breaker."""
+        self._failure_threshold = failure_threshold
+        self._backoff_base = backoff_base
+        self._backoff_max = backoff_max
+        self._probe_timeout = probe_timeout
+        self._clock = clock
+        self._failures = 0
+        self._next_probe = 0.0
+        self._half_open = False
+
+    @property
+    def is_open(self) -> bool:
+        """Return True when requests to the host are suspended."""
+        return self._failures >= self._failure_threshold
+
+    @property
+    def is_half_open(self) -> bool:
+        """Return True when a probe succeeded and one update may try the host."""
+        return self._half_open
+
+    @property
+    def failures(self) -> int:
+        """Return the number of consecutive failures."""
+        return self._failures
+
+    @property
+    def next_probe_in(self) -> float:
+        """Return the number of seconds until the next probe is allowed."""
+        if not self.is_open:
+            return 0
+        return max(self._next_probe - self._clock(), 0)
+
+    def allow_probe(self) -> bool:
+        """Return True when the open circuit may probe the host again."""
+        return self._clock() >= self._next_probe
+
+    def record_probe_success(self) -> None:
+        """Half-open the circuit, the failures are kept until an update succeeds."""
+        self._half_open = True
+
+    def record_success(self) -> None:
+        """Close the circuit."""
+        self._failures = 0
+        self._next_probe = 0.0
+        self._half_open = False
+
+    def record_failure(self) -> None:
+        """Register a failure, open the circuit or back off further."""
+        self._half_open = False
+        self._failures += 1
+        if self.is_open:
+            backoff = min(
+                self._backoff_base * 2 ** min(self._failures - self._failure_threshold, 16),
+                self._backoff_max,
+            )
+            # Jitter prevents all offline speakers from being probed at the same moment
+            self._next_probe = self._clock() + backoff * random.uniform(0.5, 1)
+
+    async def async_probe(self, host: str, port: int) -> bool:
+        """Check if the host accepts TCP connections, without any HTTP request."""
+        try:
+            _, writer = await asyncio.wait_for(
+                asyncio.open_connection(host, port), timeout=self._probe_timeout
+            )
+        except (OSError, asyncio.TimeoutError):
+            return False
+
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+        return True
@@ -0,0 +1,88 @@
+"""Command coalescing for the Devialet integration."""
+from __future__ import annotations
+
+import asyncio
+from typing import Awaitable, Callable
+
+from .const import LOGGER
+
+COALESCE_WINDOW = 0.2
+
+
+class _PendingCommand:
+    """Newest value of a command and the callers waiting for it."""
+
+    __slots__ = ("value", "send", "futures", "task", "sending")
+
+    def __init__(self):
+        """Initialize the pending command."""
+        self.value = None
+        self.send: Callable[[any], Awaitable[bool | None]] | None = None
+        self.futures = []
+        self.task: asyncio.Task | None = None
+        self.sending = False
+
+
+class CommandCoalescer:
+    """Send only the newest value of a command once per flush window."""
+
+    def __init__(self, window: float = COALESCE_WINDOW):
+        """Initialize the coalescer."""
+        self._window = window
+        self._commands = {}
+
+    def pending(self, key: str) -> any | None:
+        """Return the newest value of a command that was not applied yet.
+
+        A value stays pending while its request is in flight, so relative changes
+        like volume steps build on it instead of on the old state.
+        """
+        command = self._commands.get(key)
+        if command is None or not (command.futures or command.sending):
+            return None
+        return command.value
+
+    async def async_submit(
+        self, key: str, value: any, send: Callable[[any], Awaitable[bool | None]]
+    ) -> bool | None:
+        """Queue a value, return the result of the request that carried it or a newer one."""
+        command = self._commands.get(key)
+        if command is None:
+            command = self._commands[key] = _PendingCommand()
+
+        command.value = value
+        command.send = send
+        future = asyncio.get_running_loop().create_future()
+        command.futures.append(future)
+
+        if command.task is None:
+            command.task = asyncio.ensure_future(self._async_flush(key, command))
+
+        return await asyncio.shield(future)
+
+    async def _async_flush(self, key: str, command: _PendingCommand) -> None:
+        """Send the newest value after the window, repeat while new values arrive."""
+        try:
+            while command.futures:
+                await asyncio.sleep(self._window)
+
+                # Values arriving while this request is in flight are collapsed into the next one
+                value, futures, command.futures = command.value, command.futures, []
+                command.sending = True
+                try:
+                    result = await command.send(value)
+                except Exception as err:  # pylint: disable=broad-except
+                    LOGGER.debug("Coalesced %s command failed %s", key, repr(err))
+                    result = False
+                finally:
+                    command.sending = False
+
+                for future in futures:
+                    if not future.done():
+                        future.set_result(result)
+        finally:
+            for future in command.futures:
+                if not future.done():
+                    future.cancel()
+            if self._commands.get(key) is command:
+                del self._commands[key]
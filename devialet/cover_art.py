@@ -0,0 +1,227 @@
+"""Cover art cache for the Devialet integration."""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Callable, NamedTuple
+
+import aiohttp
+
+from .const import LOGGER
+
+MAX_CACHE_BYTES = 32 * 1024 * 1024
+MAX_IMAGE_BYTES = 5 * 1024 * 1024
+REVALIDATE_AFTER = 300
+FETCH_TIMEOUT = 5
+
+
+class CoverArt(NamedTuple):
+    """An image and the validators to revalidate it."""
+
+    key: str
+    url: str
+    content_type: str | None
+    data: bytes
+    etag: str | None
+    last_modified: str | None
+    fetched_at: float
+
+
+def content_key(data: bytes) -> str:
+    """Return the content hash of an image, it only changes with the image."""
+    return hashlib.sha256(data).hexdigest()
+
+
+class CoverArtCache:
+    """Fetch cover art once, keep it in a byte bounded LRU and optionally on disk."""
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        max_bytes: int = MAX_CACHE_BYTES,
+        cache_dir: str | None = None,
+        revalidate_after: float = REVALIDATE_AFTER,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initialize the cache, images are stored on disk when a directory is given."""
+        self._session = session
+        self._max_bytes = max_bytes
+        self._cache_dir = cache_dir
+        self._revalidate_after = revalidate_after
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._keys = {}
+        self._size = 0
+        self._inflight = {}
+
+    @property
+    def size(self) -> int:
+        """Return the number of bytes in memory."""
+        return self._size
+
+    def get(self, url: str) -> CoverArt | None:
+        """Return the image of a URL from memory, without fetching it."""
+        cover_art = self._entries.get(url)
+        if cover_art is not None:
+            self._entries.move_to_end(url)
+        return cover_art
+
+    def get_by_key(self, key: str) -> CoverArt | None:
+        """Return an image by its content hash, for immutable caching by front ends."""
+        url = self._keys.get(key)
+        return None if url is None else self.get(url)
+
+    async def async_get(self, url: str) -> CoverArt | None:
+        """Return the image of a URL, concurrent requests for a URL share one fetch."""
+        task = self._inflight.get(url)
+        if task is None:
+            task = self._inflight[url] = asyncio.ensure_future(self._async_fetch(url))
+            task.add_done_callback(lambda _: self._inflight.pop(url, None))
+        return await asyncio.shield(task)
+
+    def invalidate(self, url: str) -> None:
+        """Forget the image of a URL."""
+        cover_art = self._entries.pop(url, None)
+        if cover_art is not None:
+            self._remove_key(cover_art)
+        if self._cache_dir is not None:
+            try:
+                os.remove(self._cache_path(url))
+            except OSError:
+                pass
+
+    async def _async_fetch(self, url: str) -> CoverArt | None:
+        """Return a fresh image, revalidate or download it when needed."""
+        cover_art = self.get(url)
+        if cover_art is None and self._cache_dir is not None:
+            cover_art = await asyncio.get_running_loop().run_in_executor(
+                None, self._read_cover_art, url
+            )
+        if cover_art is not None and self._clock() - cover_art.fetched_at < self._revalidate_after:
+            return cover_art
+
+        headers = {}
+        if cover_art is not None:
+            if cover_art.etag:
+                headers["If-None-Match"] = cover_art.etag
+            if cover_art.last_modified:
+                headers["If-Modified-Since"] = cover_art.last_modified
+
+        try:
+            async with self._session.get(
+                url, headers=headers, timeout=aiohttp.ClientTimeout(total=FETCH_TIMEOUT)
+            ) as response:
+                if response.status == 304 and cover_art is not None:
+                    cover_art = cover_art._replace(fetched_at=self._clock())
+                elif response.status == 200:
+                    data = await self._async_read(response)
+                    if data is None:
+                        LOGGER.debug("Cover art %s exceeds %d bytes", url, MAX_IMAGE_BYTES)
+                        return cover_art
+                    cover_art = CoverArt(
+                        key=content_key(data),
+                        url=url,
+                        content_type=response.content_type,
+                        data=data,
+                        etag=response.headers.get("ETag"),
+                        last_modified=response.headers.get("Last-Modified"),
+                        fetched_at=self._clock(),
+                    )
+                else:
+                    LOGGER.debug("Cover art %s: HTTP %s", url, response.status)
+                    return cover_art
+        except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+            # A stale image is better than none
+            LOGGER.debug("Cover art %s: fetch failed %s", url, repr(err))
+            return cover_art
+
+        self._store(cover_art)
+        if self._cache_dir is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self._write_cover_art, cover_art)
+        return cover_art
+
+    @staticmethod
+    async def _async_read(response: aiohttp.ClientResponse) -> bytes | None:
+        """Read the body, None when it is too large."""
+        if (response.content_length or 0) > MAX_IMAGE_BYTES:
+            return None
+        chunks = []
+        size = 0
+        async for chunk in response.content.iter_chunked(65536):
+            size += len(chunk)
+            if size > MAX_IMAGE_BYTES:
+                return None
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+    def _store(self, cover_art: CoverArt) -> None:
+        """Add an image to the memory tier, evict the least recently used ones."""
+        previous = self._entries.pop(cover_art.url, None)
+        if previous is not None:
+            self._remove_key(previous)
+        if len(cover_art.data) > self._max_bytes:
+            return
+
+        self._entries[cover_art.url] = cover_art
+        self._keys[cover_art.key] = cover_art.url
+        self._size += len(cover_art.data)
+        while self._size > self._max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._remove_key(evicted)
+
+    def _remove_key(self, cover_art: CoverArt) -> None:
+        """Account for an image that left the memory tier."""
+        self._size -= len(cover_art.data)
+        if self._keys.get(cover_art.key) == cover_art.url:
+            del self._keys[cover_art.key]
+
+    def _cache_path(self, url: str) -> str:
+        """Return the metadata file of a URL, the image is stored next to it by content hash."""
+        return os.path.join(self._cache_dir, hashlib.sha256(url.encode()).hexdigest() + ".json")
+
+    def _read_cover_art(self, url: str) -> CoverArt | None:
+        """Read an image from disk."""
+        try:
+            with open(self._cache_path(url), encoding="utf-8") as file:
+                metadata = json.load(file)
+            with open(os.path.join(self._cache_dir, metadata["key"]), "rb") as file:
+                data = file.read()
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        if content_key(data) != metadata["key"]:
+            return None
+        # Revalidate images from an earlier run before using them
+        return CoverArt(
+            key=metadata["key"],
+            url=url,
+            content_type=metadata.get("content_type"),
+            data=data,
+            etag=metadata.get("etag"),
+            last_modified=metadata.get("last_modified"),
+            fetched_at=self._clock() - self._revalidate_after,
+        )
+
+    def _write_cover_art(self, cover_art: CoverArt) -> None:
+        """Write an image to disk, identical images share one file."""
+        try:
+            os.makedirs(self._cache_dir, exist_ok=True)
+            path = os.path.join(self._cache_dir, cover_art.key)
+            if not os.path.exists(path):
+                with open(path, "wb") as file:
+                    file.write(cover_art.data)
+            with open(self._cache_path(cover_art.url), "w", encoding="utf-8") as file:
+                json.dump(
+                    {
+                        "key": cover_art.key,
+                        "content_type": cover_art.content_type,
+                        "etag": cover_art.etag,
+                        "last_modified": cover_art.last_modified,
+                    },
+                    file,
+                )
+        except OSError as err:
+            LOGGER.debug("Unable to write cover art cache %s", repr(err))
@@ -0,0 +1,67 @@
+"""JSON decoding of the Devialet responses."""
+from __future__ import annotations
+
+import json
+from typing import Callable
+
+from .const import UrlSuffix
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+JsonDecoder = Callable[[bytes], any]
+
+# The fields of every endpoint that DevialetApi exposes, None keeps the whole value
+RESPONSE_FIELDS = {
+    UrlSuffix.GET_GENERAL_INFO: {
+        "deviceId": None,
+        "isSystemLeader": None,
+        "groupId": None,
+        "systemId": None,
+        "serial": None,
+        "deviceName": None,
+        "role": None,
+        "model": None,
+        "release": {"version": None},
+    },
+    UrlSuffix.GET_SOURCES: {
+        "sources": {"sourceId": None, "deviceId": None, "type": None},
+    },
+    UrlSuffix.GET_CURRENT_SOURCE: {
+        "source": {"sourceId": None, "deviceId": None, "type": None},
+        "playingState": None,
+        "muteState": None,
+        "availableOperations": None,
+        "metadata": {
+            "title": None,
+            "artist": None,
+            "album": None,
+            "coverArtUrl": None,
+            "duration": None,
+        },
+    },
+    UrlSuffix.GET_VOLUME: {"volume": None},
+    UrlSuffix.GET_NIGHT_MODE: {"nightMode": None},
+    UrlSuffix.GET_EQUALIZER: {"enabled": None, "preset": None},
+    UrlSuffix.GET_CURRENT_POSITION: {"position": None},
+}
+
+
+def get_json_decoder() -> JsonDecoder:
+    """Return the fastest available decoder, orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads
+    return json.loads
+
+
+def select_fields(data: any, fields: dict | None) -> any:
+    """Return only the given fields of a decoded response, lists are selected per item."""
+    if fields is None:
+        return data
+    if isinstance(data, list):
+        return [select_fields(item, fields) for item in data]
+    if not isinstance(data, dict):
+        return data
+    return {key: select_fields(data[key], nested) for key, nested in fields.items() if key in data}
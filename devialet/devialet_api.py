@@ -4,71 +4,288 @@ from __future__ import annotations
 import asyncio
 import datetime
 import json
-import re
+import logging
+import time
+from typing import TYPE_CHECKING, AsyncIterator, Callable, NamedTuple
+from urllib.parse import urljoin, urlsplit
 
 import aiohttp
-from async_upnp_client.aiohttp import AiohttpRequester
-from async_upnp_client.client_factory import UpnpFactory
-from async_upnp_client.exceptions import (UpnpActionResponseError,
-                                          UpnpXmlParseError)
-from async_upnp_client.profiles.dlna import DmrDevice
-from async_upnp_client.search import async_search
-from async_upnp_client.utils import CaseInsensitiveDict
 
-from .const import AV_TRANSPORT, LOGGER, NORMAL_INPUTS, MEDIA_RENDERER, SPEAKER_POSITIONS, UrlSuffix
+from .circuit_breaker import CircuitBreaker
+from .coalescer import CommandCoalescer
+from .const import AV_TRANSPORT, LOGGER, NORMAL_INPUTS, SPEAKER_POSITIONS, UrlSuffix
+from .cover_art import CoverArt, CoverArtCache
+from .decoder import RESPONSE_FIELDS, JsonDecoder, get_json_decoder, select_fields
+from .events import EVENT_SAFETY_INTERVAL, UpnpEventListener, parse_dmr_event
+from .icy import IcyMetadataCache, IcyStreamReader
+from .metrics import DevialetMetrics, MetricSample
+from .request_queue import PRIORITY_COMMAND, PRIORITY_POLL, RequestQueue
+from .rtt import RttEstimator
+from .scheduler import PollScheduler
+from .state import (DevialetState, parse_equalizer, parse_general_info,
+                    parse_night_mode, parse_source_state, parse_volume)
+from .watch import WATCH_INTERVAL, ChangeEvent, StateWatcher
+
+if TYPE_CHECKING:
+    from async_upnp_client.profiles.dlna import DmrDevice
 
 UPNP_SEARCH_INTERVAL = 120
+MAX_CONCURRENT_REQUESTS = 3
+UPDATE_TIMEOUT = 4
+VOLUME_STEP = 0.01
+POSITION_SYNC_INTERVAL = 30
+# Only a device that answered this recently gets a retry after a timeout
+RETRY_WINDOW = 60
+
+# Returned by _async_get_request when the body equals the previous one of the endpoint
+UNCHANGED = object()
+
+INPUT_NAMES = {name: pretty_name for pretty_name, name in NORMAL_INPUTS.items()}
+
+STATE_PARSERS = {
+    UrlSuffix.GET_GENERAL_INFO: parse_general_info,
+    UrlSuffix.GET_CURRENT_SOURCE: parse_source_state,
+    UrlSuffix.GET_VOLUME: parse_volume,
+    UrlSuffix.GET_NIGHT_MODE: parse_night_mode,
+    UrlSuffix.GET_EQUALIZER: parse_equalizer,
+}
+STATE_FIELDS = {suffix: tuple(parser(None)) for suffix, parser in STATE_PARSERS.items()}
+
+
+class SourceIndex(NamedTuple):
+    """Lookup tables of the available sources."""
+
+    types: dict
+    source_ids: dict
+    source_list: list
+
+
+def build_source_index(sources: any, device_id: str | None, device_role: str | None) -> SourceIndex:
+    """Build the source lookup tables once per sources payload."""
+    types = {}
+    source_ids = {}
+
+    for source in sources["sources"]:
+        source_type = source["type"]
+        source_device_id = source["deviceId"]
+
+        if device_role in SPEAKER_POSITIONS and source_type in (
+            "optical",
+            "opticaljack",
+        ):
+            # Stereo devices have the role FrontLeft or FrontRight.
+            # Add a suffix to the source to recognize the device.
+            for role, position in SPEAKER_POSITIONS.items():
+                if (source_device_id == device_id and role == device_role) or (
+                    source_device_id != device_id and role != device_role
+                ):
+                    source_type = source_type + "_" + position
+
+        types[(source["sourceId"], source_device_id)] = source_type
+        pretty_name = INPUT_NAMES.get(source_type)
+        if pretty_name is not None:
+            source_ids[pretty_name] = source["sourceId"]
+
+    return SourceIndex(types, source_ids, sorted(source_ids))
 
 class DevialetApi:
     """Devialet API class."""
 
-    def __init__(self, host:str, session:aiohttp.ClientSession):
-        """Initialize the Devialet API."""
+    def __init__(
+        self,
+        host:str,
+        session:aiohttp.ClientSession,
+        concurrent_update:bool=False,
+        max_concurrent_requests:int=MAX_CONCURRENT_REQUESTS,
+        update_timeout:float | None=UPDATE_TIMEOUT,
+        poll_scheduler:PollScheduler | None=None,
+        coalesce_window:float | None=None,
+        volume_step:float=VOLUME_STEP,
+        circuit_breaker:CircuitBreaker | None=None,
+        metrics_hook:Callable[[MetricSample], None] | None=None,
+        json_decoder:JsonDecoder | None=None,
+        select_response_fields:bool=False,
+        position_sync_interval:float=POSITION_SYNC_INTERVAL,
+        cover_art_cache:CoverArtCache | None=None,
+        icy_cache:IcyMetadataCache | None=None,
+        max_in_flight_requests:int | None=None,
+        hedge_requests:bool=False,
+    ):
+        """Initialize the Devialet API.
+
+        Requests in flight are bounded by max_in_flight_requests, by default
+        max_concurrent_requests polls plus one slot that is kept for commands.
+        """
 
         self._host = host
+        self._hostname = urlsplit("http://" + host).hostname
+        self._port = urlsplit("http://" + host).port or 80
         self._session = session
-
-        self._general_info = None
-        self._volume = None
-        self._muted = False
+        self._concurrent_update = concurrent_update
+        self._max_concurrent_requests = max_concurrent_requests
+        self._update_timeout = update_timeout
+        self._scheduler = poll_scheduler
+        self._coalescer = None if coalesce_window is None else CommandCoalescer(coalesce_window)
+        self._volume_step = volume_step
+        self._circuit_breaker = circuit_breaker
+        self._metrics = DevialetMetrics(host, metrics_hook)
+        self._json_decoder = json_decoder or get_json_decoder()
+        self._select_response_fields = select_response_fields
+        self._position_sync_interval = position_sync_interval
+        self._cover_art_cache = cover_art_cache
+        self._icy_cache = icy_cache
+        self._stream_reader: IcyStreamReader | None = None
+        self._request_queue = RequestQueue(max_in_flight_requests or max_concurrent_requests + 1)
+        self._rtt = RttEstimator()
+        self._hedge_requests = hedge_requests
+
+        self._state = DevialetState()
         self._source_state = None
         self._current_position = 0
         self._sources = None
-        self._night_mode = None
-        self._equalizer = None
-        self._source_list = {}
+        self._source_index: SourceIndex | None = None
         self._position_updated_at = 0
+        self._position_synced_at = 0.0
+        self._position_sync_needed = True
         self._media_duration = 0
-        self._device_role = ""
         self._is_available = False
         self._upnp_device = None
         self._dmr_device = None
         self._last_upnp_search: datetime.datetime = None
+        self._fingerprints = {}
+        self._changed_endpoints = frozenset()
+        self._pending = {}
+        self._update_started = 0.0
+        self._group_leader: DevialetApi | None = None
+        self._events_active = False
+        self._event_refresh_needed = False
+        self._events_polled_at = 0.0
+        self._event_callback: Callable[[], None] | None = None
+        self._watcher: StateWatcher | None = None
 
     async def async_update(self) -> bool | None:
         """Get the latest details from the device."""
-        if self._general_info is None:
-            self._general_info = await self._async_get_request(UrlSuffix.GET_GENERAL_INFO)
+        started = time.perf_counter()
+        requests = self._metrics.requests
+        try:
+            return await self._async_update()
+        finally:
+            # Updates skipped by the scheduler or the circuit breaker are not measured
+            if self._metrics.requests != requests:
+                self._metrics.record_update(time.perf_counter() - started)
+            self._publish_changes()
+
+    def watch(
+        self, interval: float | None = WATCH_INTERVAL, initial: bool = True
+    ) -> AsyncIterator[ChangeEvent]:
+        """Yield the state changes, async for change in api.watch().
+
+        The device is updated every interval seconds, shared by all subscribers. Pass
+        None when updates are driven elsewhere, like a DevialetFleet or UPnP events.
+        Changes a subscriber did not read yet are folded into one per kind. With
+        initial, the known values are yielded first.
+        """
+        if self._watcher is None:
+            self._watcher = StateWatcher(self)
+        return self._watcher.watch(interval, initial)
+
+    def _publish_changes(self) -> None:
+        """Send the state changes to the watch subscribers."""
+        if self._watcher is not None:
+            self._watcher.publish()
+
+    async def _async_update(self) -> bool | None:
+        """Refresh the endpoints that are due."""
+        started = asyncio.get_running_loop().time()
+        scheduler = self._scheduler
+        self._changed_endpoints = frozenset()
+        self._update_started = started
+
+        if scheduler is not None and not any(
+            scheduler.is_due(suffix) for suffix in self._scheduled_suffixes()
+        ):
+            return self._state.device_id is not None
+
+        circuit_breaker = self._circuit_breaker
+        if circuit_breaker is not None and circuit_breaker.is_open:
+            # Offline devices are only probed with a TCP connect, until they answer again
+            if not circuit_breaker.allow_probe():
+                return self._state.device_id is not None
+            if not await circuit_breaker.async_probe(self._hostname, self._port):
+                circuit_breaker.record_failure()
+                return self._state.device_id is not None
+            # The port is open, one update finds out if the device answers
+            circuit_breaker.record_probe_success()
+
+        if self._state.device_id is None:
+            general_info = await self._async_get_request(UrlSuffix.GET_GENERAL_INFO)
+            if self._apply_response(UrlSuffix.GET_GENERAL_INFO, general_info):
+                self._changed_endpoints = frozenset((UrlSuffix.GET_GENERAL_INFO,))
+            if scheduler is not None:
+                scheduler.mark_polled(UrlSuffix.GET_GENERAL_INFO)
 
         # Without general info the device has not been online yet
-        if self._general_info is None:
+        if self._state.device_id is None:
+            if scheduler is not None:
+                scheduler.mark_polled(UrlSuffix.GET_CURRENT_SOURCE)
+            if circuit_breaker is not None:
+                circuit_breaker.record_failure()
             return False
 
-        self._source_state = await self._async_get_request(UrlSuffix.GET_CURRENT_SOURCE)
+        changed = set(self._changed_endpoints)
+        leader = self._available_group_leader()
+        evented = leader is None and self._events_cover_polling()
+        if evented:
+            # Events keep the source state and the volume up to date
+            source_state_changed = probe_changed = False
+        elif leader is None:
+            if self._events_active:
+                self._events_polled_at = time.monotonic()
+                self._event_refresh_needed = False
+            source_state = await self._async_get_request(
+                UrlSuffix.GET_CURRENT_SOURCE, skip_unchanged=True
+            )
+            source_state_changed = self._apply_response(UrlSuffix.GET_CURRENT_SOURCE, source_state)
+            if source_state_changed:
+                changed.add(UrlSuffix.GET_CURRENT_SOURCE)
+            probe_changed = source_state_changed
+        else:
+            # Followers probe with the volume, the group state comes from the leader
+            volume = await self._async_get_request(UrlSuffix.GET_VOLUME, skip_unchanged=True)
+            probe_changed = self._apply_response(UrlSuffix.GET_VOLUME, volume)
+            if probe_changed:
+                changed.add(UrlSuffix.GET_VOLUME)
+            source_state_changed = self._is_available and self._apply_group_state(leader, changed)
+        self._changed_endpoints = frozenset(changed)
+
+        if source_state_changed and self._stream_reader is not None and self.source not in (None, "upnp"):
+            # Another source took over from the stream
+            await self.async_stop_stream_title()
+
+        if scheduler is not None:
+            scheduler.set_idle(not self._is_available or self.playing_state != "playing")
+            scheduler.mark_polled(
+                self._probe_suffix(), probe_changed or source_state_changed
+            )
+
+        if circuit_breaker is not None:
+            if self._is_available:
+                circuit_breaker.record_success()
+            else:
+                circuit_breaker.record_failure()
+
         # The source state call is enough to find out if the device is available (On or Off)
         if not self._is_available:
             # Set upnp to none, so discovery will find the new port when it's online again
+            if self._upnp_device is not None:
+                from .discovery import get_discovery_registry  # pylint: disable=import-outside-toplevel
+
+                get_discovery_registry().invalidate(self._hostname)
+                await self.async_unsubscribe_events()
             self._upnp_device = None
             self._dmr_device = None
             return True
 
-        if self._sources is None:
-            self._sources = await self._async_get_request(UrlSuffix.GET_SOURCES)
-
-        self._volume = await self._async_get_request(UrlSuffix.GET_VOLUME)
-        self._night_mode = await self._async_get_request(UrlSuffix.GET_NIGHT_MODE)
-        self._equalizer = await self._async_get_request(UrlSuffix.GET_EQUALIZER)
-
         try:
             self._media_duration = self._source_state["metadata"]["duration"]
         except (KeyError, TypeError):
@@ -79,17 +296,294 @@ class DevialetApi:
         if self._media_duration == 0:
             self._media_duration = None
 
-        if self._media_duration is not None:
-            position = await self._async_get_request(UrlSuffix.GET_CURRENT_POSITION)
+        suffixes = [UrlSuffix.GET_NIGHT_MODE, UrlSuffix.GET_EQUALIZER]
+        if leader is None:
+            if not evented:
+                suffixes.insert(0, UrlSuffix.GET_VOLUME)
+            if self._sources is None or scheduler is not None:
+                suffixes.insert(0, UrlSuffix.GET_SOURCES)
+        if (
+            leader is None
+            and self._media_duration is not None
+            and self._position_sync_due(source_state_changed)
+        ):
+            # A position equal to the previous one still has to restart the extrapolation
+            self._fingerprints.pop(UrlSuffix.GET_CURRENT_POSITION, None)
+            suffixes.append(UrlSuffix.GET_CURRENT_POSITION)
+
+        if scheduler is not None:
+            suffixes.append(UrlSuffix.GET_GENERAL_INFO)
+            suffixes = [
+                suffix
+                for suffix in suffixes
+                if scheduler.is_due(suffix)
+                or (suffix is UrlSuffix.GET_SOURCES and self._sources is None)
+                or suffix is UrlSuffix.GET_CURRENT_POSITION
+            ]
+
+        responses = await self._async_get_requests(suffixes, started)
+        for suffix, response in responses.items():
+            suffix_changed = self._apply_response(suffix, response)
+            if suffix_changed:
+                changed.add(suffix)
+            # The position is synced on its own terms, see _position_sync_due
+            if scheduler is not None and suffix is not UrlSuffix.GET_CURRENT_POSITION:
+                scheduler.mark_polled(suffix, suffix_changed)
+        self._changed_endpoints = frozenset(changed)
+
+        return True
+
+    @property
+    def changed_endpoints(self) -> frozenset:
+        """Return the endpoints whose data changed during the last update."""
+        return self._changed_endpoints
+
+    @property
+    def next_update_in(self) -> float:
+        """Return the number of seconds until the next update is due."""
+        if self._scheduler is None:
+            return 0
+        return self._scheduler.next_due(self._scheduled_suffixes())
+
+    def _scheduled_suffixes(self) -> list:
+        """Return the endpoints the next update would refresh."""
+        if self._state.device_id is None or not self._is_available:
+            return [self._probe_suffix()]
+
+        if self._events_cover_polling():
+            return [
+                UrlSuffix.GET_SOURCES,
+                UrlSuffix.GET_NIGHT_MODE,
+                UrlSuffix.GET_EQUALIZER,
+                UrlSuffix.GET_GENERAL_INFO,
+            ]
+
+        if self._available_group_leader() is not None:
+            return [
+                UrlSuffix.GET_VOLUME,
+                UrlSuffix.GET_NIGHT_MODE,
+                UrlSuffix.GET_EQUALIZER,
+                UrlSuffix.GET_GENERAL_INFO,
+            ]
+
+        suffixes = [
+            UrlSuffix.GET_CURRENT_SOURCE,
+            UrlSuffix.GET_SOURCES,
+            UrlSuffix.GET_VOLUME,
+            UrlSuffix.GET_NIGHT_MODE,
+            UrlSuffix.GET_EQUALIZER,
+            UrlSuffix.GET_GENERAL_INFO,
+        ]
+        return suffixes
+
+    def _events_cover_polling(self) -> bool:
+        """Return True when UPnP events replace the polls of the source state and volume."""
+        return (
+            self._events_active
+            and not self._event_refresh_needed
+            and time.monotonic() - self._events_polled_at < EVENT_SAFETY_INTERVAL
+        )
+
+    def _probe_suffix(self) -> UrlSuffix:
+        """Return the endpoint that tells if the device is available."""
+        if self._available_group_leader() is not None:
+            return UrlSuffix.GET_VOLUME
+        return UrlSuffix.GET_CURRENT_SOURCE
+
+    def _available_group_leader(self) -> DevialetApi | None:
+        """Return the leader to take the group state from, None to poll it directly."""
+        leader = self._group_leader
+        if leader is None or not leader.is_available or leader.device_id is None:
+            return None
+        return leader
+
+    def _apply_group_state(self, leader: DevialetApi, changed: set) -> bool:
+        """Take the group endpoints from the leader, return True when the source state changed."""
+        if self._apply_response(UrlSuffix.GET_SOURCES, leader._sources):
+            changed.add(UrlSuffix.GET_SOURCES)
+
+        source_state_changed = self._apply_response(
+            UrlSuffix.GET_CURRENT_SOURCE, leader._source_state
+        )
+        if source_state_changed:
+            changed.add(UrlSuffix.GET_CURRENT_SOURCE)
+
+        if leader._current_position != self._current_position:
+            changed.add(UrlSuffix.GET_CURRENT_POSITION)
+        self._current_position = leader._current_position
+        self._position_updated_at = leader._position_updated_at
+        self._position_synced_at = leader._position_synced_at
+        return source_state_changed
+
+    @property
+    def group_leader(self) -> DevialetApi | None:
+        """Return the leader whose group state is shared with this device."""
+        return self._group_leader
+
+    def set_group_leader(self, leader: DevialetApi | None) -> None:
+        """Share the group state of the leader instead of polling it, None to poll it."""
+        if leader is self:
+            leader = None
+        if leader is None and self._group_leader is not None:
+            # Polling takes over, sync the position of this device
+            self._position_sync_needed = True
+        self._group_leader = leader
+
+    def _position_sync_due(self, source_state_changed: bool) -> bool:
+        """Return True when the extrapolated position has to be confirmed by the device."""
+        if (
+            self._position_sync_interval <= 0
+            or self._position_sync_needed
+            or self._current_position is None
+            or source_state_changed
+        ):
+            return True
+        # A paused position does not drift
+        if self._state.playing_state != "playing":
+            return False
+        return time.monotonic() - self._position_synced_at >= self._position_sync_interval
+
+    async def _async_get_requests(self, suffixes: list, started: float) -> dict:
+        """Fetch the given endpoints, one after another or concurrently."""
+        if not self._concurrent_update:
+            return {
+                suffix: await self._async_get_request(suffix, skip_unchanged=True)
+                for suffix in suffixes
+            }
+
+        # The deadline covers the whole update cycle, including the availability probe
+        timeout = None
+        if self._update_timeout is not None:
+            timeout = max(
+                self._update_timeout - (asyncio.get_running_loop().time() - started), 0
+            )
+
+        semaphore = asyncio.Semaphore(self._max_concurrent_requests)
+
+        async def _async_limited_request(suffix: UrlSuffix) -> any | None:
+            async with semaphore:
+                return await self._async_get_request(suffix, skip_unchanged=True)
+
+        tasks = {
+            asyncio.ensure_future(_async_limited_request(suffix)): suffix
+            for suffix in suffixes
+        }
+        try:
+            done, pending = await asyncio.wait(tasks, timeout=timeout)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+            LOGGER.debug(
+                "Host %s: update deadline exceeded, keeping previous %s",
+                self._host,
+                ", ".join(tasks[task].name for task in pending),
+            )
+
+        # Endpoints that missed the deadline keep their previous value
+        return {tasks[task]: task.result() for task in done}
+
+    def _apply_response(self, suffix: UrlSuffix, response: any | None) -> bool:
+        """Store the response of an endpoint, return True when it changed."""
+        if response is UNCHANGED and suffix not in STATE_PARSERS:
+            return False
+
+        if suffix is UrlSuffix.GET_CURRENT_POSITION:
             try:
-                self._current_position = position["position"]
-                self._position_updated_at = datetime.datetime.now(tz=datetime.timezone.utc).replace(tzinfo=None)
+                self._set_position(response["position"])
+                self._position_sync_needed = False
             except (KeyError, TypeError):
                 self._current_position = None
                 self._position_updated_at = None
+            return True
+
+        if suffix is UrlSuffix.GET_SOURCES:
+            # A failed poll keeps the last known sources, like the general info
+            if response is None or response == self._sources:
+                return False
+            self._sources = response
+            self._source_index = None
+            return True
 
+        if response is UNCHANGED or (
+            suffix is UrlSuffix.GET_CURRENT_SOURCE and response == self._source_state
+        ):
+            # The device still reports the last polled values, only optimistic ones can change
+            fields = {
+                field: self._pending[field][2]
+                for field in STATE_FIELDS[suffix]
+                if field in self._pending
+            }
+            raw_changed = False
+        elif suffix is UrlSuffix.GET_GENERAL_INFO and response is None:
+            # Keep the last known general info, it identifies the device
+            return False
+        else:
+            if suffix is UrlSuffix.GET_CURRENT_SOURCE:
+                # The raw source state stays available through the source_state property
+                self._source_state = response
+            fields = STATE_PARSERS[suffix](response)
+            raw_changed = suffix is UrlSuffix.GET_CURRENT_SOURCE
+
+        self._reconcile(fields)
+        state = self._state._replace(**fields)
+        if state == self._state:
+            return raw_changed
+        if suffix is UrlSuffix.GET_GENERAL_INFO:
+            self._source_index = None
+        self._state = state
         return True
 
+    def _reconcile(self, fields: dict) -> None:
+        """Confirm or roll back optimistic values with polled fields."""
+        for field in fields.keys() & self._pending.keys():
+            value, sent_at, _ = self._pending[field]
+            if sent_at > self._update_started:
+                # The poll may have been answered before the command, keep the optimistic value
+                fields[field] = value
+                continue
+
+            del self._pending[field]
+            if fields[field] != value:
+                LOGGER.debug(
+                    "Host %s: %s rolled back from %s to %s", self._host, field, value, fields[field]
+                )
+
+    def _set_optimistic(self, sent_at: float, **fields) -> None:
+        """Apply the expected result of a command until a poll confirms it."""
+        for field, value in fields.items():
+            # Remember the polled value, to roll back when an unchanged response arrives
+            polled = self._pending[field][2] if field in self._pending else getattr(self._state, field)
+            self._pending[field] = (value, sent_at, polled)
+        if "playing_state" in fields and self._current_position is not None:
+            # Freeze or restart the extrapolation at the current position
+            self._set_position(self.current_position)
+            self._position_sync_needed = True
+        self._state = self._state._replace(**fields)
+        self._publish_changes()
+
+    @property
+    def pending_fields(self) -> frozenset:
+        """Return the state fields with an optimistic value that was not confirmed yet."""
+        return frozenset(self._pending)
+
+    @property
+    def metrics(self) -> DevialetMetrics:
+        """Return the request and update metrics."""
+        return self._metrics
+
+    @property
+    def rtt(self) -> RttEstimator:
+        """Return the round trip time estimate the request timeouts are based on."""
+        return self._rtt
+
+    @property
+    def state(self) -> DevialetState:
+        """Return the state snapshot of the last update."""
+        return self._state
+
     @property
     def is_available(self) -> bool | None:
         """Return available."""
@@ -103,58 +597,47 @@ class DevialetApi:
     @property
     def device_id(self) -> str | None:
         """Return the device id."""
-        try:
-            return self._general_info["deviceId"]
-        except (KeyError, TypeError):
-            return None
+        return self._state.device_id
 
     @property
     def is_system_leader(self) -> bool | None:
         """Return the boolean for system leader identification."""
-        try:
-            return self._general_info["isSystemLeader"]
-        except (KeyError, TypeError):
-            return None
+        return self._state.is_system_leader
+
+    @property
+    def group_id(self) -> str | None:
+        """Return the group id."""
+        return self._state.group_id
+
+    @property
+    def system_id(self) -> str | None:
+        """Return the system id."""
+        return self._state.system_id
 
     @property
     def serial(self) -> str | None:
         """Return the serial."""
-        try:
-            return self._general_info["serial"]
-        except (KeyError, TypeError):
-            return None
+        return self._state.serial
 
     @property
     def device_name(self) -> str | None:
         """Return the device name."""
-        try:
-            return self._general_info["deviceName"]
-        except (KeyError, TypeError):
-            return None
+        return self._state.device_name
 
     @property
     def device_role(self) -> str | None:
         """Return the device role."""
-        try:
-            return self._general_info["role"]
-        except (KeyError, TypeError):
-            return None
+        return self._state.device_role
 
     @property
     def model(self) -> str | None:
         """Return the device model."""
-        try:
-            return self._general_info["model"]
-        except (KeyError, TypeError):
-            return None
+        return self._state.model
 
     @property
     def version(self) -> str | None:
         """Return the device version."""
-        try:
-            return self._general_info["release"]["version"]
-        except (KeyError, TypeError):
-            return None
+        return self._state.version
 
     @property
     def source_state(self) -> any | None:
@@ -164,26 +647,17 @@ class DevialetApi:
     @property
     def playing_state(self) -> str | None:
         """Return the state of the device."""
-        try:
-            return self._source_state["playingState"]
-        except (KeyError, TypeError):
-            return None
+        return self._state.playing_state
 
     @property
     def volume_level(self) -> float | None:
         """Volume level of the media player (0..1)."""
-        try:
-            return self._volume["volume"] * 0.01
-        except (KeyError, TypeError):
-            return None
+        return self._state.volume_level
 
     @property
     def is_volume_muted(self) -> bool | None:
         """Return boolean if volume is currently muted."""
-        try:
-            return self._source_state["muteState"] == "muted"
-        except (KeyError, TypeError):
-            return None
+        return self._state.is_volume_muted
 
     @property
     def dmr_device(self) -> DmrDevice | None:
@@ -193,71 +667,81 @@ class DevialetApi:
     @property
     def source_list(self) -> list | None:
         """Return the list of available input sources."""
-
-        if self._sources is None or len(self._source_list) > 0:
-            return sorted(self._source_list)
-
-        for source in self._sources["sources"]:
-            source_type = source["type"]
-            device_id = source["deviceId"]
-
-            if self.device_role in SPEAKER_POSITIONS and source_type in (
-                "optical",
-                "opticaljack",
-            ):
-                # Stereo devices have the role FrontLeft or FrontRight.
-                # Add a suffix to the source to recognize the device.
-                for role, position in SPEAKER_POSITIONS.items():
-                    if (device_id == self.device_id and role == self.device_role) or (
-                        device_id != self.device_id and role != self.device_role
-                    ):
-                        source_type = source_type + "_" + position
-
-            for pretty_name, name in NORMAL_INPUTS.items():
-                if name == source_type:
-                    self._source_list[pretty_name] = name
-
-        return sorted(self._source_list)
+        source_index = self._get_source_index()
+        if source_index is None:
+            return []
+        return source_index.source_list
+
+    def _get_source_index(self) -> SourceIndex | None:
+        """Return the source index, build it when the sources changed."""
+        if self._source_index is None and self._sources is not None:
+            try:
+                self._source_index = build_source_index(
+                    self._sources, self.device_id, self.device_role
+                )
+            except (KeyError, TypeError):
+                return None
+        return self._source_index
 
     @property
     def available_operations(self) -> any | None:
         """Return the list of available operations for this source."""
-        try:
-            return self._source_state["availableOperations"]
-        except (KeyError, TypeError):
-            return None
+        return self._state.available_operations
 
     @property
     def media_artist(self) -> str | None:
         """Artist of current playing media, music track only."""
-        try:
-            return self._source_state["metadata"]["artist"]
-        except (KeyError, TypeError):
-            return None
+        return self._state.media_artist
 
     @property
     def media_album_name(self) -> str | None:
         """Album name of current playing media, music track only."""
-        try:
-            return self._source_state["metadata"]["album"]
-        except (KeyError, TypeError):
-            return None
+        return self._state.media_album_name
 
     @property
     def media_title(self) -> str | None:
-        """Return the current media info."""
-        try:
-            return self._source_state["metadata"]["title"]
-        except (KeyError, TypeError):
+        """Return the current media info, the live title of a followed stream first."""
+        return self.stream_title or self._state.media_title
+
+    @property
+    def stream_title(self) -> str | None:
+        """Return the in-band title of the stream played by async_play_url_source.
+
+        None once the reader stopped, then media_title falls back to the device.
+        """
+        if self._stream_reader is None:
             return None
+        return self._stream_reader.title
 
     @property
     def media_image_url(self) -> str | None:
         """Image url of current playing media, not available for Airplay."""
-        try:
-            return self._source_state["metadata"]["coverArtUrl"]
-        except (KeyError, TypeError):
+        return self._state.media_image_url
+
+    @property
+    def media_image_key(self) -> str | None:
+        """Content hash of the current cover art, None until it was fetched."""
+        url = self._media_image_absolute_url()
+        if url is None or self._cover_art_cache is None:
+            return None
+        cover_art = self._cover_art_cache.get(url)
+        return None if cover_art is None else cover_art.key
+
+    async def async_get_media_image(self) -> CoverArt | None:
+        """Return the cover art of the current playing media, from the cache when possible."""
+        url = self._media_image_absolute_url()
+        if url is None:
+            return None
+        if self._cover_art_cache is None:
+            self._cover_art_cache = CoverArtCache(self._session)
+        return await self._cover_art_cache.async_get(url)
+
+    def _media_image_absolute_url(self) -> str | None:
+        """Return the cover art url, relative urls are served by the device."""
+        url = self._state.media_image_url
+        if not url:
             return None
+        return urljoin("http://" + self._host, url)
 
     @property
     def media_duration(self) -> int | None:
@@ -266,276 +750,552 @@ class DevialetApi:
 
     @property
     def current_position(self) -> int | None:
-        """Position of current playing media in seconds."""
-        return self._current_position
+        """Position of current playing media in seconds, extrapolated while playing."""
+        position = self._current_position
+        if position is None or self._state.playing_state != "playing":
+            return position
+
+        position = int(position + time.monotonic() - self._position_synced_at)
+        if self._media_duration:
+            position = min(position, self._media_duration)
+        return position
 
     @property
     def position_updated_at(self) -> datetime.datetime | None:
         """When was the position of the current playing media valid."""
-        return self._position_updated_at
+        if self._current_position is None or self._state.playing_state != "playing":
+            return self._position_updated_at
+        return datetime.datetime.now(tz=datetime.timezone.utc).replace(tzinfo=None)
+
+    def _set_position(self, position: int) -> None:
+        """Store a confirmed position, extrapolation starts from here."""
+        self._current_position = position
+        self._position_updated_at = datetime.datetime.now(tz=datetime.timezone.utc).replace(tzinfo=None)
+        self._position_synced_at = time.monotonic()
 
     @property
     def source(self) -> str | None:
         """Return the current input source."""
-        try:
-            source_id = self._source_state["source"]["sourceId"]
-            device_id = self._source_state["source"]["deviceId"]
-
-            # Devialet Arch has a different source description.
-            for source in self._sources["sources"]:
-                if source["sourceId"] == source_id and source["deviceId"] == device_id:
-                    source_type = source["type"]
-
-                    if (
-                        source_type == "optical" or source_type == "opticaljack"
-                    ) and self.device_role in SPEAKER_POSITIONS:
-                        for role, position in SPEAKER_POSITIONS.items():
-                            if (
-                                device_id == self.device_id and role == self.device_role
-                            ) or (
-                                device_id != self.device_id and role != self.device_role
-                            ):
-                                source_type = source_type + "_" + position
-                    return source_type
-        except (KeyError, TypeError):
+        # Devialet Arch has a different source description.
+        source_index = self._get_source_index()
+        if source_index is None:
             return None
-        return None
+        return source_index.types.get((self._state.source_id, self._state.source_device_id))
 
     @property
     def night_mode(self) -> bool | None:
         """Return the current nightmode state."""
-        try:
-            return self._night_mode["nightMode"] == "on"
-        except (KeyError, TypeError):
-            return None
+        return self._state.night_mode
 
     @property
     def equalizer(self) -> str | None:
         """Return the current equalizer preset."""
-        try:
-            if self._equalizer["enabled"]:
-                return self._equalizer["preset"]
-        except (KeyError, TypeError):
-            return None
+        return self._state.equalizer
 
     async def async_get_diagnostics(self) -> any | None:
         """Return the diagnostic data."""
         return {
             "is_available": self._is_available,
-            "general_info": self._general_info,
+            "state": self._state._asdict(),
             "sources": self._sources,
             "source_state": self._source_state,
-            "volume": self._volume,
-            "night_mode": self._night_mode,
-            "equalizer": self._equalizer,
             "source_list": self.source_list,
             "source": self.source,
+            "group_leader": self._group_leader.device_id if self._group_leader else None,
+            "events_active": self._events_active,
             "upnp_device_type": getattr(self._upnp_device.device_info, 'device_type') if self._upnp_device else "Not available",
             "upnp_device_url": getattr(self._upnp_device.device_info, 'url') if self._upnp_device else "Not available",
+            "metrics": self._metrics.as_dict(),
+            "rtt": self._rtt.as_dict(),
         }
 
+    async def async_prewarm(self) -> bool:
+        """Open a connection ahead of a command, the volume is refreshed on the way."""
+        volume = await self._async_get_request(
+            UrlSuffix.GET_VOLUME, skip_unchanged=True, priority=PRIORITY_COMMAND
+        )
+        self._apply_response(UrlSuffix.GET_VOLUME, volume)
+        return self._is_available
+
     async def async_volume_up(self) -> None:
         """Volume up media player."""
-        await self._async_post_request(UrlSuffix.VOLUME_UP)
+        if not await self._async_step_volume(self._volume_step):
+            await self._async_post_request(UrlSuffix.VOLUME_UP)
 
     async def async_volume_down(self) -> None:
         """Volume down media player."""
-        await self._async_post_request(UrlSuffix.VOLUME_DOWN)
+        if not await self._async_step_volume(-self._volume_step):
+            await self._async_post_request(UrlSuffix.VOLUME_DOWN)
+
+    async def _async_step_volume(self, step: float) -> bool:
+        """Fold a volume step into an absolute coalesced volume, when possible."""
+        if self._coalescer is None:
+            return False
+
+        volume = self._coalescer.pending("volume")
+        if volume is None:
+            volume = self.volume_level
+        if volume is None:
+            return False
+
+        await self.async_set_volume_level(min(max(volume + step, 0), 1))
+        return True
 
-    async def async_set_volume_level(self, volume: float) -> None:
+    async def async_set_volume_level(self, volume: float) -> bool | None:
         """Set volume level, range 0..1."""
-        await self._async_post_request(
+        if self._coalescer is not None:
+            return await self._coalescer.async_submit("volume", volume, self._async_send_volume)
+        return await self._async_send_volume(volume)
+
+    async def _async_send_volume(self, volume: float) -> bool | None:
+        """Send the volume level, range 0..1."""
+        return await self._async_post_command(
             UrlSuffix.VOLUME_SET,
             json_body={"volume": volume * 100},
+            volume_level=volume,
         )
 
-    async def async_mute_volume(self, mute: bool) -> None:
+    async def async_mute_volume(self, mute: bool) -> bool | None:
         """Mute (true) or unmute (false) media player."""
         if mute:
-            await self._async_post_request(UrlSuffix.MUTE)
+            return await self._async_post_command(UrlSuffix.MUTE, is_volume_muted=True)
         else:
-            await self._async_post_request(UrlSuffix.UNMUTE)
+            return await self._async_post_command(UrlSuffix.UNMUTE, is_volume_muted=False)
 
-    async def async_media_play(self) -> None:
+    async def async_media_play(self) -> bool | None:
         """Play media player."""
-        await self._async_post_request(UrlSuffix.PLAY)
+        return await self._async_post_command(UrlSuffix.PLAY, playing_state="playing")
 
-    async def async_media_pause(self) -> None:
+    async def async_media_pause(self) -> bool | None:
         """Pause media player."""
-        await self._async_post_request(UrlSuffix.PAUSE)
+        return await self._async_post_command(UrlSuffix.PAUSE, playing_state="paused")
 
-    async def async_media_stop(self) -> None:
+    async def async_media_stop(self) -> bool | None:
         """Pause media player."""
-        await self._async_post_request(UrlSuffix.PAUSE)
+        return await self._async_post_command(UrlSuffix.PAUSE, playing_state="paused")
 
-    async def async_media_next_track(self) -> None:
+    async def async_media_next_track(self) -> bool | None:
         """Send the next track command."""
-        await self._async_post_request(UrlSuffix.NEXT_TRACK)
+        return await self._async_post_request(UrlSuffix.NEXT_TRACK)
 
-    async def async_media_previous_track(self) -> None:
+    async def async_media_previous_track(self) -> bool | None:
         """Send the previous track command."""
-        await self._async_post_request(UrlSuffix.PREVIOUS_TRACK)
+        return await self._async_post_request(UrlSuffix.PREVIOUS_TRACK)
 
-    async def async_media_seek(self, position: float) -> None:
+    async def async_media_seek(self, position: float) -> bool | None:
         """Send seek command."""
+        if self._coalescer is not None:
+            return await self._coalescer.async_submit("seek", position, self._async_send_seek)
+        return await self._async_send_seek(position)
 
-        await self._async_post_request(
+    async def _async_send_seek(self, position: float) -> bool | None:
+        """Send the seek position."""
+        result = await self._async_post_request(
             UrlSuffix.SEEK,
             json_body={"position": int(position)},
         )
-
-    async def async_set_night_mode(self, night_mode: bool) -> None:
+        if result:
+            # Extrapolate from the new position until the device confirms it
+            self._set_position(int(position))
+            self._position_sync_needed = True
+            if self._group_leader is not None:
+                self._group_leader._position_sync_needed = True
+        return result
+
+    async def async_set_night_mode(self, night_mode: bool) -> bool | None:
         """Set the night mode."""
         if night_mode:
             mode = "on"
         else:
             mode = "off"
 
-        await self._async_post_request(
+        return await self._async_post_command(
             UrlSuffix.NIGHT_MODE,
             json_body={"nightMode": mode},
+            night_mode=night_mode,
         )
 
-    async def async_set_equalizer(self, preset: str) -> None:
+    async def async_set_equalizer(self, preset: str) -> bool | None:
         """Set the equalizer preset."""
-        await self._async_post_request(
+        return await self._async_post_command(
             UrlSuffix.EQUALIZER,
             json_body={"preset": preset},
+            equalizer=preset,
         )
 
-    async def async_turn_off(self) -> None:
+    async def async_turn_off(self) -> bool | None:
         """Turn off media player."""
-        await self._async_post_request(UrlSuffix.TURN_OFF)
+        return await self._async_post_request(UrlSuffix.TURN_OFF)
 
-    async def async_select_source(self, source: str) -> None:
+    async def async_select_source(self, source: str) -> bool | None:
         """Select input source."""
-        source_id = None
-
-        try:
-            name = NORMAL_INPUTS[source]
-        except KeyError:
+        if source not in NORMAL_INPUTS:
             LOGGER.error("Unknown source %s selected", source)
-            return
+            return False
 
-        if "_" in name:
-            name_split = name.split("_")
-
-            for role, position in SPEAKER_POSITIONS.items():
-                if position != name_split[1]:
-                    continue
-
-                if role == self.device_role:
-                    for _source in self._sources["sources"]:
-                        if (
-                            _source["deviceId"] == self.device_id
-                            and _source["type"] == name_split[0]
-                        ):
-                            source_id = _source["sourceId"]
-                            break
-                else:
-                    for _source in self._sources["sources"]:
-                        if (
-                            _source["deviceId"] != self.device_id
-                            and _source["type"] == name_split[0]
-                        ):
-                            source_id = _source["sourceId"]
-                            break
-                break
-        else:
-            for _source in self._sources["sources"]:
-                if _source["type"] == name:
-                    source_id = _source["sourceId"]
+        source_index = self._get_source_index()
+        source_id = source_index.source_ids.get(source) if source_index else None
 
         if source_id is None:
             LOGGER.error("Source %s is not available", source)
-            return
+            return False
 
-        await self._async_post_request(
+        return await self._async_post_request(
             str(UrlSuffix.SELECT_SOURCE).replace("%SOURCE_ID%", source_id)
         )
 
-    async def _async_get_request(self, suffix: str) -> any | None:
-        """Generic GET method."""
+    async def _async_post_command(self, suffix: str, json_body: any=None, **optimistic) -> bool | None:
+        """Send a command, apply its expected state when it succeeds."""
+        sent_at = asyncio.get_running_loop().time()
+        result = await self._async_post_request(suffix, json_body={} if json_body is None else json_body)
+        if result and optimistic:
+            self._set_optimistic(sent_at, **optimistic)
+        return result
+
+    async def _async_get_request(
+        self, suffix: str, skip_unchanged: bool=False, priority: int=PRIORITY_POLL
+    ) -> any | None:
+        """Generic GET method, queued with the other requests to the host.
+
+        With skip_unchanged, UNCHANGED is returned without decoding when the body
+        is identical to the previous response of the endpoint. Polls of an endpoint
+        that are still queued share one request.
+        """
+        return await self._request_queue.async_run(
+            lambda: self._async_send_get_request(
+                suffix, skip_unchanged, self._hedge_requests and priority == PRIORITY_POLL
+            ),
+            priority,
+            (suffix, skip_unchanged) if priority == PRIORITY_POLL else None,
+        )
+
+    async def _async_send_get_request(
+        self, suffix: str, skip_unchanged: bool, hedge: bool
+    ) -> any | None:
+        """Send a GET request."""
         url = "http://" + self._host + str(suffix)
+        # Forget the previous fingerprint until this request succeeds
+        previous_fingerprint = self._fingerprints.pop(suffix, None)
+        started = time.perf_counter()
+        bytes_received = 0
+        error = None
+        unchanged = False
 
         try:
-            async with self._session.get(
-                url=url, allow_redirects=False, timeout=2
-            ) as response:
-                response = await response.read()
-                LOGGER.debug(
-                    "Host %s: HTTP Response data: %s",
-                    self._host,
-                    response,
-                )
-
-            response_json = json.loads(response)
+            response = await self._async_fetch(url, hedge)
+            if LOGGER.isEnabledFor(logging.DEBUG):
+                LOGGER.debug("Host %s: HTTP Response data: %s", self._host, response)
+            bytes_received = len(response)
+
+            # A cheap fingerprint of the raw body, most polls return identical payloads
+            fingerprint = hash(response)
+            if skip_unchanged and fingerprint == previous_fingerprint:
+                self._is_available = True
+                self._fingerprints[suffix] = fingerprint
+                unchanged = True
+                return UNCHANGED
+
+            response_json = self._json_decoder(response)
             self._is_available = True
+            self._fingerprints[suffix] = fingerprint
 
             if "error" in response_json:
                 LOGGER.debug(response_json["error"])
+                error = "ErrorResponse"
                 return None
 
+            if self._select_response_fields:
+                # Only keep what the API exposes, the rest is never read
+                return select_fields(response_json, RESPONSE_FIELDS.get(suffix))
             return response_json
 
         except aiohttp.ClientConnectorError as conn_err:
             LOGGER.debug("Host %s: Connection error %s", self._host, str(conn_err))
             self._is_available = False
+            error = type(conn_err).__name__
             return None
         except asyncio.TimeoutError:
             LOGGER.debug("Devialet connection timeout exception. Please check the connection")
             self._is_available = False
+            error = "TimeoutError"
             return None
-        except (TypeError, json.JSONDecodeError):
+        except (TypeError, ValueError) as err:
             LOGGER.debug("Get request: JSON error")
+            error = type(err).__name__
             return None
-        except Exception:  # pylint: disable=bare-except
+        except asyncio.CancelledError:
+            error = "CancelledError"
+            raise
+        except Exception as err:  # pylint: disable=broad-except
             LOGGER.debug("Get request: unknown exception occurred")
+            error = type(err).__name__
             return None
+        finally:
+            self._metrics.record_request(
+                "GET " + str(suffix),
+                time.perf_counter() - started,
+                bytes_received,
+                error,
+                unchanged,
+            )
+
+    async def _async_fetch(self, url: str, hedge: bool) -> bytes:
+        """Read a GET response within the estimated timeout.
+
+        A device that answered recently may take longer than the initial timeout
+        and gets one retry after a timeout, with the backed off timeout. An
+        unavailable device is capped at the initial timeout and not retried.
+        """
+        timeout = self._request_timeout()
+        try:
+            if hedge:
+                return await self._async_hedged_read(url, timeout)
+            return await self._async_read(url, timeout)
+        except asyncio.TimeoutError:
+            if not self._is_answering():
+                raise
+            self._rtt.record_timeout()
+
+        # A GET can be repeated, a slow but healthy device gets at least the initial timeout
+        timeout = max(self._rtt.timeout, self._rtt.initial_timeout)
+        LOGGER.debug("Host %s: retrying within %.2f s", self._host, timeout)
+        return await self._async_read(url, timeout)
+
+    def _is_answering(self) -> bool:
+        """Return True when the device is available and answered recently."""
+        return self._is_available and self._rtt.answered_within(RETRY_WINDOW)
+
+    def _request_timeout(self) -> float:
+        """Return the estimated timeout, capped at the initial one unless the device is answering."""
+        if self._is_answering():
+            return self._rtt.timeout
+        return min(self._rtt.timeout, self._rtt.initial_timeout)
+
+    async def _async_read(self, url: str, timeout: float) -> bytes:
+        """Read a GET response, the round trip time is added to the estimate."""
+        started = time.perf_counter()
+        async with self._session.get(
+            url=url, allow_redirects=False, timeout=aiohttp.ClientTimeout(total=timeout)
+        ) as response:
+            body = await response.read()
+        self._rtt.record(time.perf_counter() - started)
+        return body
+
+    async def _async_hedged_read(self, url: str, timeout: float) -> bytes:
+        """Send a second GET when the first one is slower than the p95, return the first response."""
+        p95 = self._rtt.p95
+        if p95 is None or p95 >= timeout:
+            return await self._async_read(url, timeout)
+
+        deadline = time.perf_counter() + timeout
+        tasks = {asyncio.ensure_future(self._async_read(url, timeout))}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=p95)
+            if not done:
+                # The second GET takes a slot of the queue like any other request to the host
+                tasks.add(
+                    asyncio.ensure_future(
+                        self._request_queue.async_run(
+                            lambda: self._async_read(url, timeout - p95), PRIORITY_POLL
+                        )
+                    )
+                )
+            while True:
+                done, pending = await asyncio.wait(
+                    tasks,
+                    timeout=max(deadline - time.perf_counter(), 0),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done:
+                    raise asyncio.TimeoutError
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                if not pending:
+                    return done.pop().result()
+                tasks = pending
+        finally:
+            for task in tasks:
+                task.cancel()
+            # Collect the outcome of the losing GET, it may fail right as it is cancelled
+            await asyncio.gather(*tasks, return_exceptions=True)
 
     async def _async_post_request(self, suffix:str, json_body:str={}) -> bool | None:
-        """Generic POST method."""
+        """Generic POST method, commands go before the queued polls of the host."""
+        return await self._request_queue.async_run(
+            lambda: self._async_send_post_request(suffix, json_body), PRIORITY_COMMAND
+        )
+
+    async def _async_send_post_request(self, suffix: str, json_body: any) -> bool | None:
+        """Send a POST request."""
         url = "http://" + self._host + str(suffix)
+        timeout = self._rtt.command_timeout if self._is_answering() else self._rtt.initial_timeout
+        started = time.perf_counter()
+        bytes_received = 0
+        error = None
 
         try:
             async with self._session.post(
-                url=url, json=json_body, allow_redirects=False, timeout=2
+                url=url,
+                json=json_body,
+                allow_redirects=False,
+                timeout=aiohttp.ClientTimeout(total=timeout),
             ) as response:
                 response_data = await response.text()
+            if LOGGER.isEnabledFor(logging.DEBUG):
                 LOGGER.debug(
                     "Host %s: HTTP %s Response data: %s",
                     self._host,
                     response.status,
                     response_data,
                 )
+            bytes_received = len(response_data)
+            if response.status >= 400:
+                error = "HTTP " + str(response.status)
 
+            if self._scheduler is not None:
+                # Speed up polling to pick up the result of the command
+                self._scheduler.boost()
             return True
 
         except aiohttp.ClientConnectorError as conn_err:
             LOGGER.debug("Host %s: Connection error %s", self._host, str(conn_err))
+            error = type(conn_err).__name__
             return False
         except asyncio.TimeoutError:
             LOGGER.debug(
                 "Devialet connection timeout exception, please check the connection"
             )
+            if self._is_available:
+                self._rtt.record_timeout()
+            error = "TimeoutError"
             return False
-        except (TypeError, json.JSONDecodeError):
+        except (TypeError, json.JSONDecodeError) as err:
             LOGGER.debug("Post request: unknown response type")
+            error = type(err).__name__
             return False
-        except Exception:  # pylint: disable=bare-except
+        except asyncio.CancelledError:
+            error = "CancelledError"
+            raise
+        except Exception as err:  # pylint: disable=broad-except
             LOGGER.debug("Post request: unknown exception occurred")
+            error = type(err).__name__
+            return False
+        finally:
+            self._metrics.record_request(
+                "POST " + str(suffix), time.perf_counter() - started, bytes_received, error
+            )
+
+    async def _async_create_upnp_device(self, location: str) -> None:
+        """Create the UPnP device from its location."""
+        # pylint: disable=import-outside-toplevel
+        from async_upnp_client.exceptions import UpnpError
+        from async_upnp_client.profiles.dlna import DmrDevice
+
+        from .discovery import get_description_cache, get_discovery_registry
+
+        discovered = get_discovery_registry().get(self._hostname)
+        headers = discovered.headers if discovered is not None else None
+        try:
+            self._upnp_device = await get_description_cache().async_get_device(location, headers)
+        except UpnpError as err:
+            LOGGER.debug("Host %s: UPnP device error %s", self._host, repr(err))
+            # The location may be outdated, search again next time
+            get_discovery_registry().invalidate(self._hostname)
+            get_description_cache().invalidate(location)
+            return
+        self._dmr_device = DmrDevice(self._upnp_device, None)
+
+    @property
+    def events_active(self) -> bool:
+        """Return True while UPnP events replace part of the polling."""
+        return self._events_active
+
+    async def async_subscribe_events(
+        self,
+        listener: UpnpEventListener | None = None,
+        callback: Callable[[], None] | None = None,
+    ) -> bool:
+        """Subscribe to the UPnP events, the callback is called on every change.
+
+        Polling continues when the subscription fails.
+        """
+        if not self.upnp_available:
+            return False
+        if self._events_active:
+            return True
+
+        # pylint: disable=import-outside-toplevel
+        from async_upnp_client.exceptions import UpnpError
+        from async_upnp_client.profiles.dlna import DmrDevice
+
+        from .events import get_event_listener
+
+        # Drop a subscription that stopped delivering events
+        await self.async_unsubscribe_events()
+
+        listener = listener or get_event_listener()
+        try:
+            event_handler = await listener.async_start()
+            # The initial event may arrive before the subscription returns
+            self._dmr_device = dmr_device = DmrDevice(self._upnp_device, event_handler)
+            self._event_callback = callback
+            dmr_device.on_event = self._on_upnp_event
+            await dmr_device.async_subscribe_services(auto_resubscribe=True)
+        except (UpnpError, OSError) as err:
+            LOGGER.debug("Host %s: UPnP subscription failed %s, polling", self._host, repr(err))
             return False
 
-    async def _async_on_search_response(self, data: CaseInsensitiveDict) -> None:
-        """UPnP device detected."""
-        location = data['location']
-        location_regex = re.compile(f"(?<=Location:[ ])*http://{self._host}:(.*)/.*.xml", re.IGNORECASE)
-        location_result = location_regex.search(location)
-        if location_result:
-            requester = AiohttpRequester()
-            factory = UpnpFactory(requester)
-            self._upnp_device = await factory.async_create_device(location)
-            self._dmr_device = DmrDevice(self._upnp_device, None)
+        self._events_active = dmr_device.is_subscribed
+        self._events_polled_at = time.monotonic()
+        return self._events_active
+
+    async def async_unsubscribe_events(self) -> None:
+        """Stop the UPnP events, polling takes over."""
+        # pylint: disable=import-outside-toplevel
+        from async_upnp_client.exceptions import UpnpError
+
+        self._events_active = False
+        self._event_callback = None
+        if self._dmr_device is None or not self._dmr_device.is_subscribed:
+            return
+        try:
+            await self._dmr_device.async_unsubscribe_services()
+        except (UpnpError, OSError) as err:
+            LOGGER.debug("Host %s: UPnP unsubscribe failed %s", self._host, repr(err))
+
+    def _on_upnp_event(self, service: any, state_variables: list) -> None:
+        """Apply the changed state variables of an event to the state."""
+        if not state_variables:
+            # An empty event means that resubscribing failed
+            LOGGER.debug("Host %s: UPnP subscription lost, polling", self._host)
+            self._events_active = False
+            return
+
+        fields = parse_dmr_event(
+            self._dmr_device, {state_variable.name for state_variable in state_variables}
+        )
+        if not fields:
+            return
+
+        # The event is the state of the device, it replaces any optimistic value
+        for field in fields:
+            self._pending.pop(field, None)
+        if "playing_state" in fields and self._current_position is not None:
+            self._set_position(self.current_position)
+            self._position_sync_needed = True
+
+        state = self._state._replace(**fields)
+        if state == self._state:
+            return
+        if state.playing_state != self._state.playing_state or state.media_title != self._state.media_title:
+            # The source state has more than the event, fetch it with the next update
+            self._event_refresh_needed = True
+        self._state = state
+        self._publish_changes()
+
+        if self._event_callback is not None:
+            self._event_callback()
 
     async def async_search_allowed(self) -> bool:
         """Conditions to check if UPnP search is allowed."""
@@ -551,19 +1311,24 @@ class DevialetApi:
     async def async_discover_upnp_device(self) -> None:
         """Discover the UPnP device."""
         self._last_upnp_search = datetime.datetime.now()
-
-        await async_search(async_callback=self._async_on_search_response,
-                           timeout=10,
-                           search_target=MEDIA_RENDERER,
-                           source=("0.0.0.0", 0))
         LOGGER.debug("Discovering UPnP device for %s", self._host)
+        # The UPnP stack is only loaded by speakers that use it
+        from .discovery import get_discovery_registry  # pylint: disable=import-outside-toplevel
+
+        # One search is shared by all speakers, known locations are cached
+        location = await get_discovery_registry().async_get_location(self._hostname)
+        if location is not None:
+            await self._async_create_upnp_device(location)
 
-    async def async_play_url_source(self, media_id: str, mime_type: str, media_title: str, default_title: bool=False) -> bool:
-        """Play media uri over UPnP."""
+    async def async_play_url_source(self, media_id: str, mime_type: str, media_title: str, default_title: bool=False, follow_stream_title: bool=False) -> bool:
+        """Play media uri over UPnP, optionally follow the title of a radio stream."""
         if not self.upnp_available:
             LOGGER.error("No UPnP location discovered")
             return
 
+        # pylint: disable=import-outside-toplevel
+        from async_upnp_client.exceptions import UpnpActionResponseError, UpnpXmlParseError
+
         if default_title:
             media_title = await self.async_get_upnp_media_title(media_id) or media_title
 
@@ -581,6 +1346,9 @@ class DevialetApi:
         try:
             result = await set_uri.async_call(InstanceID=0, CurrentURI=media_id, CurrentURIMetaData=metadata)
             LOGGER.debug("Action result: %s", str(result))
+            await self.async_stop_stream_title()
+            if follow_stream_title:
+                await self.async_follow_stream_title(media_id)
             return True
         except UpnpActionResponseError as a:
             LOGGER.error("Error playing %s: %s", media_title, a.error_desc)
@@ -597,6 +1365,9 @@ class DevialetApi:
             LOGGER.error("No UPnP location discovered")
             return
 
+        # pylint: disable=import-outside-toplevel
+        from async_upnp_client.exceptions import UpnpActionResponseError, UpnpXmlParseError
+
         service = self._upnp_device.service(AV_TRANSPORT)
         set_uri = service.action("Play")
 
@@ -609,24 +1380,37 @@ class DevialetApi:
             return
 
     async def async_get_upnp_media_title(self, url: str) -> str | None:
-        """Call the media URL with the HEAD method to get ICY metadata."""
-        try:
-            async with self._session.head(
-                url=url, allow_redirects=False, timeout=2, headers={"Icy-MetaData": "1"}
-            ) as response:
-                LOGGER.debug(
-                    "Host %s: HTTP Response data: %s",
-                    self._host,
-                    response.headers,
-                )
-            title:str = response.headers.get("icy-description") or response.headers.get("icy-name")
-            return title
-
-        except aiohttp.ClientConnectorError:
-            return
-        except asyncio.TimeoutError:
-            return
-        except TypeError:
-            return
-        except Exception:  # pylint: disable=bare-except
+        """Return the ICY station title of a media URL, cached per URL."""
+        if self._icy_cache is None:
+            self._icy_cache = IcyMetadataCache(self._session)
+        station = await self._icy_cache.async_get(url)
+        if station is None:
+            return None
+        return station.title
+
+    async def async_follow_stream_title(
+        self, url: str, callback: Callable[[str | None], None] | None = None
+    ) -> None:
+        """Read the in-band titles of a stream in the background, see stream_title.
+
+        The reader stops after READ_BUDGET bytes of the stream and clears its title,
+        call again to follow the stream for longer.
+        """
+        if self._stream_reader is not None and self._stream_reader.url == url:
+            self._stream_reader.start()
             return
+        await self.async_stop_stream_title()
+
+        def _on_stream_title(title: str | None) -> None:
+            self._publish_changes()
+            if callback is not None:
+                callback(title)
+
+        self._stream_reader = IcyStreamReader(self._session, url, _on_stream_title)
+        self._stream_reader.start()
+
+    async def async_stop_stream_title(self) -> None:
+        """Stop reading the in-band titles of a stream."""
+        stream_reader, self._stream_reader = self._stream_reader, None
+        if stream_reader is not None:
+            await stream_reader.async_stop()
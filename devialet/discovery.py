@@ -0,0 +1,300 @@
+"""UPnP discovery for the Devialet integration."""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+from typing import Callable, NamedTuple
+from urllib.parse import urlsplit
+
+from async_upnp_client.aiohttp import AiohttpRequester
+from async_upnp_client.client import UpnpDevice, UpnpRequester
+from async_upnp_client.client_factory import UpnpFactory
+from async_upnp_client.const import HttpRequest, HttpResponse
+from async_upnp_client.search import async_search
+from async_upnp_client.utils import CaseInsensitiveDict
+
+from .const import LOGGER, MEDIA_RENDERER
+
+LOCATION_TTL = 1800
+SEARCH_TIMEOUT = 10
+
+MAX_AGE_REGEX = re.compile(r"max-age\s*=\s*(\d+)", re.IGNORECASE)
+
+
+class DiscoveredLocation(NamedTuple):
+    """UPnP location of a host, as seen in a search response."""
+
+    location: str
+    headers: CaseInsensitiveDict
+    expires: float
+
+
+class UpnpDiscoveryRegistry:
+    """Run one SSDP search for all speakers and cache the locations by host."""
+
+    def __init__(
+        self,
+        search_timeout: int = SEARCH_TIMEOUT,
+        location_ttl: float = LOCATION_TTL,
+        clock: Callable[[], float] = time.monotonic,
+        target: tuple | None = None,
+    ):
+        """Initialize the registry, a target address replaces the multicast search."""
+        self._search_timeout = search_timeout
+        self._target = target
+        self._location_ttl = location_ttl
+        self._clock = clock
+        self._locations = {}
+        self._waiters = {}
+        self._search_task: asyncio.Task | None = None
+
+    @property
+    def is_searching(self) -> bool:
+        """Return True while a search is running."""
+        return self._search_task is not None
+
+    def get(self, host: str) -> DiscoveredLocation | None:
+        """Return the cached location of a host, if it did not expire."""
+        discovered = self._locations.get(host)
+        if discovered is None:
+            return None
+        if discovered.expires <= self._clock():
+            del self._locations[host]
+            return None
+        return discovered
+
+    def invalidate(self, host: str) -> None:
+        """Forget the location of a host, for example after a power cycle."""
+        self._locations.pop(host, None)
+
+    async def async_get_location(self, host: str) -> str | None:
+        """Return the location of a host, join or start a search when unknown."""
+        discovered = self.get(host)
+        if discovered is not None:
+            return discovered.location
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(host, []).append(future)
+
+        if self._search_task is None:
+            self._search_task = asyncio.ensure_future(self._async_search())
+
+        try:
+            return await future
+        finally:
+            waiters = self._waiters.get(host)
+            if waiters and future in waiters:
+                waiters.remove(future)
+
+    async def _async_search(self) -> None:
+        """Search for media renderers and resolve the waiters."""
+        LOGGER.debug("Searching for UPnP devices")
+        try:
+            await async_search(async_callback=self._async_on_search_response,
+                               timeout=self._search_timeout,
+                               search_target=MEDIA_RENDERER,
+                               source=("0.0.0.0", 0),
+                               target=self._target)
+        except OSError as err:
+            LOGGER.debug("UPnP search failed %s", repr(err))
+        finally:
+            self._search_task = None
+            # Hosts that did not respond are not available over UPnP
+            waiters, self._waiters = self._waiters, {}
+            for futures in waiters.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_result(None)
+
+    async def _async_on_search_response(self, data: CaseInsensitiveDict) -> None:
+        """UPnP device detected."""
+        host = self.record(data)
+        if host is None:
+            return
+
+        location = self._locations[host].location
+        for future in self._waiters.pop(host, []):
+            if not future.done():
+                future.set_result(location)
+
+    def record(self, data: CaseInsensitiveDict) -> str | None:
+        """Cache the location of a search response, return its host."""
+        location = data.get("location")
+        if not location:
+            return None
+
+        host = urlsplit(location).hostname
+        if host is None:
+            return None
+
+        ttl = self._location_ttl
+        max_age = MAX_AGE_REGEX.search(data.get("cache-control", ""))
+        if max_age:
+            ttl = min(ttl, int(max_age.group(1)))
+
+        self._locations[host] = DiscoveredLocation(location, data, self._clock() + ttl)
+        return host
+
+
+_REGISTRY: UpnpDiscoveryRegistry | None = None
+
+
+def get_discovery_registry() -> UpnpDiscoveryRegistry:
+    """Return the discovery registry shared by all speakers."""
+    global _REGISTRY  # pylint: disable=global-statement
+    if _REGISTRY is None:
+        _REGISTRY = UpnpDiscoveryRegistry()
+    return _REGISTRY
+
+
+def description_version(headers: CaseInsensitiveDict | None) -> str:
+    """Return the version of a device description from its SSDP headers."""
+    if not headers:
+        return ""
+    # The config id changes with the description, the boot id with every boot
+    return headers.get("configid.upnp.org") or headers.get("bootid.upnp.org") or ""
+
+
+class DescriptionCachingRequester(UpnpRequester):
+    """Requester that keeps the device and service descriptions."""
+
+    def __init__(self, requester: UpnpRequester, cache_dir: str | None = None):
+        """Initialize the requester."""
+        self._requester = requester
+        self._cache_dir = cache_dir
+        self._versions = {}
+        self._responses = {}
+
+    def set_version(self, location: str, version: str) -> None:
+        """Set the description version of the device at a location."""
+        self._versions[urlsplit(location).netloc] = version
+
+    def invalidate(self, location: str) -> None:
+        """Forget the descriptions of the device at a location."""
+        netloc = urlsplit(location).netloc
+        version = self._versions.pop(netloc, "")
+        keys = [
+            key
+            for key in self._responses
+            if key[1] == version and urlsplit(key[0]).netloc == netloc
+        ]
+        for key in keys:
+            del self._responses[key]
+            if self._cache_dir is not None:
+                try:
+                    os.remove(self._cache_path(key))
+                except OSError:
+                    pass
+
+    async def async_http_request(self, http_request: HttpRequest) -> HttpResponse:
+        """Do a HTTP request, descriptions are served from the cache."""
+        # Descriptions are the only GET requests, actions and subscriptions are never cached
+        if http_request.method != "GET":
+            return await self._requester.async_http_request(http_request)
+
+        key = (http_request.url, self._versions.get(urlsplit(http_request.url).netloc, ""))
+        response = self._responses.get(key)
+        if response is None and self._cache_dir is not None:
+            response = await asyncio.get_running_loop().run_in_executor(
+                None, self._read_response, key
+            )
+            if response is not None:
+                self._responses[key] = response
+        if response is not None:
+            return response
+
+        response = await self._requester.async_http_request(http_request)
+        if response.status_code == 200:
+            self._responses[key] = response
+            if self._cache_dir is not None:
+                await asyncio.get_running_loop().run_in_executor(
+                    None, self._write_response, key, response
+                )
+        return response
+
+    def _cache_path(self, key: tuple) -> str:
+        """Return the file of a cached response."""
+        name = hashlib.sha256("\n".join(key).encode()).hexdigest()
+        return os.path.join(self._cache_dir, name + ".json")
+
+    def _read_response(self, key: tuple) -> HttpResponse | None:
+        """Read a response from disk."""
+        try:
+            with open(self._cache_path(key), encoding="utf-8") as file:
+                data = json.load(file)
+            return HttpResponse(data["status_code"], data["headers"], data["body"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _write_response(self, key: tuple, response: HttpResponse) -> None:
+        """Write a response to disk."""
+        try:
+            os.makedirs(self._cache_dir, exist_ok=True)
+            with open(self._cache_path(key), "w", encoding="utf-8") as file:
+                json.dump(
+                    {
+                        "url": key[0],
+                        "version": key[1],
+                        "status_code": response.status_code,
+                        "headers": dict(response.headers),
+                        "body": response.body,
+                    },
+                    file,
+                )
+        except OSError as err:
+            LOGGER.debug("Unable to write description cache %s", repr(err))
+
+
+class UpnpDescriptionCache:
+    """Cache the UPnP devices by location and description version."""
+
+    def __init__(self, cache_dir: str | None = None):
+        """Initialize the cache, descriptions are stored on disk when a directory is given."""
+        self._requester = DescriptionCachingRequester(AiohttpRequester(), cache_dir)
+        self._factory = UpnpFactory(self._requester)
+        self._devices = {}
+
+    @property
+    def requester(self) -> UpnpRequester:
+        """Return the requester shared by all UPnP devices."""
+        return self._requester
+
+    async def async_get_device(
+        self, location: str, headers: CaseInsensitiveDict | None = None
+    ) -> UpnpDevice:
+        """Return the UPnP device at a location, only fetch the descriptions when unknown."""
+        version = description_version(headers)
+        key = (location, version)
+        device = self._devices.get(key)
+        if device is None:
+            self._requester.set_version(location, version)
+            device = await self._factory.async_create_device(location)
+            self._devices[key] = device
+        return device
+
+    def invalidate(self, location: str) -> None:
+        """Forget the device at a location."""
+        for key in [key for key in self._devices if key[0] == location]:
+            del self._devices[key]
+        self._requester.invalidate(location)
+
+
+_DESCRIPTION_CACHE: UpnpDescriptionCache | None = None
+
+
+def get_description_cache() -> UpnpDescriptionCache:
+    """Return the description cache shared by all speakers."""
+    global _DESCRIPTION_CACHE  # pylint: disable=global-statement
+    if _DESCRIPTION_CACHE is None:
+        _DESCRIPTION_CACHE = UpnpDescriptionCache()
+    return _DESCRIPTION_CACHE
+
+
+def set_description_cache(cache: UpnpDescriptionCache) -> None:
+    """Replace the shared description cache, for example by one stored on disk."""
+    global _DESCRIPTION_CACHE  # pylint: disable=global-statement
+    _DESCRIPTION_CACHE = cache
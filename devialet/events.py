@@ -0,0 +1,104 @@
+"""UPnP event subscriptions for the Devialet integration."""
+from __future__ import annotations
+
+import asyncio
+from typing import TYPE_CHECKING
+
+from .const import LOGGER
+
+if TYPE_CHECKING:
+    from async_upnp_client.aiohttp import AiohttpNotifyServer
+    from async_upnp_client.event_handler import UpnpEventHandler
+
+# Polls of the evented endpoints while subscribed, in case an event got lost
+EVENT_SAFETY_INTERVAL = 60
+
+
+class UpnpEventListener:
+    """Local notify server that receives the events of all subscribed speakers."""
+
+    def __init__(self, source: tuple | None = None, callback_url: str | None = None):
+        """Initialize the listener, it listens on the local address and a free port by default."""
+        self._source = source
+        self._callback_url = callback_url
+        self._server: AiohttpNotifyServer | None = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def is_started(self) -> bool:
+        """Return True when the notify server is running."""
+        return self._server is not None
+
+    @property
+    def event_handler(self) -> UpnpEventHandler | None:
+        """Return the event handler the speakers subscribe with."""
+        if self._server is None:
+            return None
+        return self._server.event_handler
+
+    async def async_start(self) -> UpnpEventHandler:
+        """Start the notify server once, return its event handler."""
+        # pylint: disable=import-outside-toplevel
+        from async_upnp_client.aiohttp import AiohttpNotifyServer
+        from async_upnp_client.utils import get_local_ip
+
+        from .discovery import get_description_cache
+
+        async with self._lock:
+            if self._server is None:
+                source = self._source or (get_local_ip(), 0)
+                server = AiohttpNotifyServer(
+                    get_description_cache().requester, source, self._callback_url
+                )
+                await server.async_start_server()
+                LOGGER.debug("Listening for UPnP events on %s", server.callback_url)
+                self._server = server
+        return self._server.event_handler
+
+    async def async_stop(self) -> None:
+        """Unsubscribe all speakers and stop the notify server."""
+        async with self._lock:
+            server, self._server = self._server, None
+            if server is None:
+                return
+            await server.event_handler.async_unsubscribe_all()
+            await server.async_stop_server()
+
+
+_LISTENER: UpnpEventListener | None = None
+
+
+def get_event_listener() -> UpnpEventListener:
+    """Return the event listener shared by all speakers."""
+    global _LISTENER  # pylint: disable=global-statement
+    if _LISTENER is None:
+        _LISTENER = UpnpEventListener()
+    return _LISTENER
+
+
+def set_event_listener(listener: UpnpEventListener) -> None:
+    """Replace the shared event listener, for example to listen on a given address."""
+    global _LISTENER  # pylint: disable=global-statement
+    _LISTENER = listener
+
+
+def parse_dmr_event(dmr_device: any, names: set) -> dict:
+    """Return the state fields of the changed UPnP state variables."""
+    fields = {}
+    if "TransportState" in names:
+        transport_state = dmr_device.transport_state
+        if transport_state is not None:
+            if transport_state.name == "PLAYING":
+                fields["playing_state"] = "playing"
+            elif transport_state.name in ("PAUSED_PLAYBACK", "STOPPED"):
+                fields["playing_state"] = "paused"
+    if "Volume" in names and dmr_device.volume_level is not None:
+        fields["volume_level"] = dmr_device.volume_level
+    if "Mute" in names and dmr_device.is_volume_muted is not None:
+        fields["is_volume_muted"] = dmr_device.is_volume_muted
+    if "CurrentTrackMetaData" in names:
+        fields["media_title"] = dmr_device.media_title
+        fields["media_artist"] = dmr_device.media_artist
+        fields["media_album_name"] = dmr_device.media_album_name
+        fields["media_image_url"] = dmr_device.media_image_url
+    return fields
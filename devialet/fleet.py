@@ -0,0 +1,250 @@
+"""Support for fleets of Devialet speakers."""
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+
+import aiohttp
+
+from .circuit_breaker import CircuitBreaker
+from .cover_art import CoverArtCache
+from .const import LOGGER
+from .devialet_api import MAX_CONCURRENT_REQUESTS, DevialetApi
+from .group import GroupCoordinator, async_group_command
+from .scanner import DevialetScanner
+
+CONNECTION_LIMIT = 256
+KEEPALIVE_TIMEOUT = 30
+MAX_CONCURRENT_UPDATES = 32
+UPDATE_INTERVAL = 5
+UPDATE_JITTER = 0.25
+
+
+class HostHealth:
+    """Health of a single host in the fleet."""
+
+    __slots__ = (
+        "updates",
+        "failures",
+        "consecutive_failures",
+        "last_success",
+        "last_error",
+        "last_duration",
+    )
+
+    def __init__(self):
+        """Initialize the host health."""
+        self.updates = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_success: float | None = None
+        self.last_error: str | None = None
+        self.last_duration: float | None = None
+
+    @property
+    def is_healthy(self) -> bool:
+        """Return True when the last update succeeded."""
+        return self.updates > 0 and self.consecutive_failures == 0
+
+    def as_dict(self) -> dict:
+        """Return the health as a dict."""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class DevialetFleet:
+    """Manage many Devialet speakers from one event loop."""
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession | None = None,
+        max_concurrent_updates: int = MAX_CONCURRENT_UPDATES,
+        update_interval: float = UPDATE_INTERVAL,
+        update_jitter: float = UPDATE_JITTER,
+        circuit_breaker: bool = True,
+        group_polling: bool = False,
+        **api_options,
+    ):
+        """Initialize the fleet, extra options are passed to every DevialetApi.
+
+        With group_polling, only group leaders poll the group state and share it.
+        """
+        self._session = session
+        self._owns_session = session is None
+        self._max_concurrent_updates = max_concurrent_updates
+        self._update_interval = update_interval
+        self._update_jitter = update_jitter
+        self._circuit_breaker = circuit_breaker
+        self._api_options = api_options
+        self._coordinator = GroupCoordinator() if group_polling else None
+        self._cover_art_cache: CoverArtCache | None = None
+        self._apis = {}
+        self._health = {}
+        self._semaphore: asyncio.Semaphore | None = None
+        self._last_cycle_duration: float | None = None
+
+    async def __aenter__(self) -> DevialetFleet:
+        """Enter the fleet context."""
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        """Close the fleet when leaving the context."""
+        await self.async_close()
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """Return the session shared by all speakers."""
+        if self._session is None:
+            # Keep a few connections alive per speaker, the embedded HTTP servers are small
+            connector = aiohttp.TCPConnector(
+                limit=CONNECTION_LIMIT,
+                # The polls of a speaker plus the slot of its request queue kept for commands
+                limit_per_host=self._api_options.get("max_in_flight_requests")
+                or self._api_options.get("max_concurrent_requests", MAX_CONCURRENT_REQUESTS) + 1,
+                keepalive_timeout=KEEPALIVE_TIMEOUT,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    @property
+    def cover_art_cache(self) -> CoverArtCache:
+        """Return the cover art cache shared by all speakers."""
+        if self._cover_art_cache is None:
+            self._cover_art_cache = CoverArtCache(self.session)
+        return self._cover_art_cache
+
+    @property
+    def apis(self) -> dict:
+        """Return the speakers of the fleet by host."""
+        return dict(self._apis)
+
+    @property
+    def available_hosts(self) -> list:
+        """Return the hosts of the available speakers."""
+        return [host for host, api in self._apis.items() if api.is_available]
+
+    @property
+    def unavailable_hosts(self) -> list:
+        """Return the hosts of the unavailable speakers."""
+        return [host for host, api in self._apis.items() if not api.is_available]
+
+    @property
+    def last_cycle_duration(self) -> float | None:
+        """Return the duration of the last update cycle in seconds."""
+        return self._last_cycle_duration
+
+    def add_host(self, host: str) -> DevialetApi:
+        """Add a speaker to the fleet."""
+        if host not in self._apis:
+            # Every host gets its own circuit breaker, offline speakers are only probed
+            circuit_breaker = CircuitBreaker() if self._circuit_breaker else None
+            api_options = {"cover_art_cache": self.cover_art_cache, **self._api_options}
+            self._apis[host] = DevialetApi(
+                host, self.session, circuit_breaker=circuit_breaker, **api_options
+            )
+            self._health[host] = HostHealth()
+            if self._coordinator is not None:
+                self._coordinator.add(host, self._apis[host])
+        return self._apis[host]
+
+    def remove_host(self, host: str) -> None:
+        """Remove a speaker from the fleet."""
+        if self._coordinator is not None:
+            self._coordinator.remove(host)
+        self._apis.pop(host, None)
+        self._health.pop(host, None)
+
+    def get(self, host: str) -> DevialetApi | None:
+        """Return the speaker of a host."""
+        return self._apis.get(host)
+
+    def health(self, host: str) -> HostHealth | None:
+        """Return the health of a host."""
+        return self._health.get(host)
+
+    async def async_update(self) -> dict:
+        """Update all speakers once, return the update results by host."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._max_concurrent_updates)
+
+        started = time.monotonic()
+        if self._coordinator is None:
+            phases = (list(self._apis),)
+        else:
+            # Followers take the group state of their leader, which has to be updated first
+            phases = self._coordinator.assign()
+
+        results = {}
+        for hosts in phases:
+            updates = await asyncio.gather(*(self._async_update_host(host) for host in hosts))
+            results.update(zip(hosts, updates))
+        self._last_cycle_duration = time.monotonic() - started
+        return results
+
+    async def async_scan(self, **scanner_options) -> list:
+        """Scan the LAN and add every device found, return the systems, see DevialetScanner."""
+        systems = await DevialetScanner(self.session, **scanner_options).async_scan()
+        for system in systems:
+            for device in system.devices:
+                self.add_host(device.host)
+        return systems
+
+    async def async_command(self, hosts: list, command: str, *args, **kwargs) -> dict:
+        """Send a command to several speakers at once, see async_group_command."""
+        apis = {host: self._apis[host] for host in hosts if host in self._apis}
+        return await async_group_command(apis, command, *args, **kwargs)
+
+    async def async_run(self) -> None:
+        """Keep updating all speakers until cancelled."""
+        while True:
+            started = time.monotonic()
+            await self.async_update()
+            await asyncio.sleep(max(self._update_interval - (time.monotonic() - started), 0))
+
+    async def async_close(self) -> None:
+        """Close the session when the fleet created it."""
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def async_get_diagnostics(self) -> any | None:
+        """Return the diagnostic data of the fleet."""
+        return {
+            "hosts": len(self._apis),
+            "available": len(self.available_hosts),
+            "last_cycle_duration": self._last_cycle_duration,
+            "health": {host: health.as_dict() for host, health in self._health.items()},
+        }
+
+    async def _async_update_host(self, host: str) -> bool | None:
+        """Update a single speaker, spread over the jitter window."""
+        # Spread the requests over the cycle to prevent a thundering herd
+        await asyncio.sleep(random.uniform(0, self._update_interval * self._update_jitter))
+
+        api = self._apis.get(host)
+        if api is None:
+            return None
+
+        async with self._semaphore:
+            started = time.monotonic()
+            try:
+                result = await api.async_update()
+                error = None if api.is_available else "unavailable"
+            except Exception as err:  # pylint: disable=broad-except
+                LOGGER.debug("Host %s: update failed %s", host, repr(err))
+                result = None
+                error = type(err).__name__
+
+        health = self._health.get(host)
+        if health is not None:
+            health.updates += 1
+            health.last_duration = time.monotonic() - started
+            if error is None:
+                health.consecutive_failures = 0
+                health.last_success = time.time()
+            else:
+                health.failures += 1
+                health.consecutive_failures += 1
+                health.last_error = error
+        return result
@@ -0,0 +1,146 @@
+"""Group aware polling of Devialet speakers."""
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import NamedTuple
+
+from .const import LOGGER
+from .devialet_api import DevialetApi
+
+
+class CommandResult(NamedTuple):
+    """Result of a group command on one speaker."""
+
+    result: bool | None
+    error: str | None
+    dispatch_offset: float
+    latency: float
+
+
+async def async_group_command(
+    apis: dict, command: str, *args, prewarm: bool = True, **kwargs
+) -> dict:
+    """Send a command like async_media_pause to all speakers at once, return the results by host.
+
+    With prewarm, every speaker gets a connection first, so the commands leave
+    together and no speaker waits for a handshake.
+    """
+    if prewarm:
+        await asyncio.gather(*(api.async_prewarm() for api in apis.values()), return_exceptions=True)
+
+    dispatched = time.perf_counter()
+
+    async def _async_send(api: DevialetApi) -> CommandResult:
+        started = time.perf_counter()
+        error = None
+        try:
+            result = await getattr(api, command)(*args, **kwargs)
+        except Exception as err:  # pylint: disable=broad-except
+            LOGGER.debug("Group command %s failed %s", command, repr(err))
+            result = None
+            error = type(err).__name__
+        if result is False and error is None:
+            error = "failed"
+        return CommandResult(result, error, started - dispatched, time.perf_counter() - started)
+
+    results = await asyncio.gather(*(_async_send(api) for api in apis.values()))
+    return dict(zip(apis, results))
+
+
+def group_key(api: DevialetApi) -> str | None:
+    """Return the group a speaker belongs to, None while it is unknown."""
+    return api.group_id or api.system_id
+
+
+class GroupCoordinator:
+    """Poll the group state once per group, on the leader, and share it with the followers.
+
+    The group of a speaker comes from its general info. Without a poll scheduler
+    that is only fetched once, so regrouping is noticed after a restart.
+    """
+
+    def __init__(self):
+        """Initialize the coordinator."""
+        self._apis = {}
+
+    @property
+    def apis(self) -> dict:
+        """Return the speakers by host."""
+        return dict(self._apis)
+
+    def add(self, host: str, api: DevialetApi) -> None:
+        """Add a speaker."""
+        self._apis[host] = api
+
+    def remove(self, host: str) -> None:
+        """Remove a speaker, its followers poll the group state again."""
+        api = self._apis.pop(host, None)
+        if api is None:
+            return
+        api.set_group_leader(None)
+        for other in self._apis.values():
+            if other.group_leader is api:
+                other.set_group_leader(None)
+
+    @property
+    def groups(self) -> dict:
+        """Return the hosts of every known group, the leader first."""
+        groups = {}
+        for host, api in self._apis.items():
+            key = group_key(api)
+            if key is not None:
+                groups.setdefault(key, []).append(host)
+        for hosts in groups.values():
+            hosts.sort(key=lambda host: not self._apis[host].is_system_leader)
+        return groups
+
+    def assign(self) -> tuple:
+        """Assign the group leaders, return the hosts to update first and the followers."""
+        leaders = []
+        followers = []
+        grouped = set()
+
+        for hosts in self.groups.values():
+            leader = self._apis[hosts[0]]
+            grouped.update(hosts)
+            if not leader.is_system_leader:
+                # Without a known leader every member polls the group state itself
+                for host in hosts:
+                    self._apis[host].set_group_leader(None)
+                leaders.extend(hosts)
+                continue
+
+            leader.set_group_leader(None)
+            leaders.append(hosts[0])
+            for host in hosts[1:]:
+                self._apis[host].set_group_leader(leader)
+                followers.append(host)
+
+        for host, api in self._apis.items():
+            if host not in grouped:
+                api.set_group_leader(None)
+                leaders.append(host)
+        return leaders, followers
+
+    async def async_command(self, key: str, command: str, *args, **kwargs) -> dict:
+        """Send a command to all speakers of a group, see async_group_command."""
+        apis = {
+            host: api for host, api in self._apis.items() if group_key(api) == key
+        }
+        return await async_group_command(apis, command, *args, **kwargs)
+
+    async def async_update(self) -> dict:
+        """Update the leaders, then the followers, return the update results by host."""
+        leaders, followers = self.assign()
+        results = {}
+        for hosts in (leaders, followers):
+            updates = await asyncio.gather(
+                *(self._apis[host].async_update() for host in hosts), return_exceptions=True
+            )
+            for host, result in zip(hosts, updates):
+                if isinstance(result, Exception):
+                    LOGGER.debug("Host %s: update failed %s", host, repr(result))
+                    result = None
+                results[host] = result
+        return results
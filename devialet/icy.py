@@ -0,0 +1,201 @@
+"""ICY (SHOUTcast) metadata of radio streams."""
+from __future__ import annotations
+
+import asyncio
+import re
+import time
+from typing import Callable, NamedTuple
+
+import aiohttp
+
+from .const import LOGGER
+
+STATION_TTL = 3600
+HEAD_TIMEOUT = 2
+READ_BUDGET = 8 * 1024 * 1024
+
+STREAM_TITLE_REGEX = re.compile(rb"StreamTitle='(.*?)';", re.DOTALL)
+
+
+class StationInfo(NamedTuple):
+    """Station headers of a stream."""
+
+    name: str | None
+    description: str | None
+    genre: str | None
+    metaint: int | None
+    fetched_at: float
+
+    @property
+    def title(self) -> str | None:
+        """Return the title to show for the station."""
+        return self.description or self.name
+
+
+def parse_stream_title(metadata: bytes) -> str | None:
+    """Return the StreamTitle of an in-band metadata block."""
+    match = STREAM_TITLE_REGEX.search(metadata)
+    if match is None:
+        return None
+    return match.group(1).decode("utf-8", errors="replace").strip() or None
+
+
+class IcyMetadataCache:
+    """Keep the station headers per stream URL for a while."""
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        ttl: float = STATION_TTL,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initialize the cache."""
+        self._session = session
+        self._ttl = ttl
+        self._clock = clock
+        self._stations = {}
+        self._inflight = {}
+
+    def get(self, url: str) -> StationInfo | None:
+        """Return the cached station headers of a URL, if they did not expire."""
+        station = self._stations.get(url)
+        if station is None:
+            return None
+        if self._clock() - station.fetched_at >= self._ttl:
+            del self._stations[url]
+            return None
+        return station
+
+    async def async_get(self, url: str) -> StationInfo | None:
+        """Return the station headers of a URL, concurrent requests share one HEAD request."""
+        station = self.get(url)
+        if station is not None:
+            return station
+
+        task = self._inflight.get(url)
+        if task is None:
+            task = self._inflight[url] = asyncio.ensure_future(self._async_fetch(url))
+            task.add_done_callback(lambda _: self._inflight.pop(url, None))
+        return await asyncio.shield(task)
+
+    async def _async_fetch(self, url: str) -> StationInfo | None:
+        """Call the media URL with the HEAD method to get the ICY headers."""
+        try:
+            async with self._session.head(
+                url=url,
+                allow_redirects=False,
+                timeout=aiohttp.ClientTimeout(total=HEAD_TIMEOUT),
+                headers={"Icy-MetaData": "1"},
+            ) as response:
+                LOGGER.debug("Stream %s: HTTP Response data: %s", url, response.headers)
+                headers = response.headers
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as err:
+            LOGGER.debug("Stream %s: ICY request failed %s", url, repr(err))
+            return None
+
+        try:
+            metaint = int(headers["icy-metaint"])
+        except (KeyError, ValueError):
+            metaint = None
+        station = StationInfo(
+            name=headers.get("icy-name"),
+            description=headers.get("icy-description"),
+            genre=headers.get("icy-genre"),
+            metaint=metaint,
+            fetched_at=self._clock(),
+        )
+        self._stations[url] = station
+        return station
+
+
+class IcyStreamReader:
+    """Follow the in-band StreamTitle of a stream over one connection."""
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        url: str,
+        callback: Callable[[str | None], None] | None = None,
+        read_budget: int = READ_BUDGET,
+    ):
+        """Initialize the reader, it stops after reading read_budget bytes of the stream."""
+        self._session = session
+        self._url = url
+        self._callback = callback
+        self._read_budget = read_budget
+        self._title: str | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def url(self) -> str:
+        """Return the stream URL."""
+        return self._url
+
+    @property
+    def title(self) -> str | None:
+        """Return the current StreamTitle, None once the reader stopped.
+
+        A title that is no longer followed would go stale, so it is cleared when the
+        read budget is used up, the connection drops or the reader is stopped.
+        """
+        return self._title
+
+    @property
+    def is_running(self) -> bool:
+        """Return True while the stream is being read."""
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start reading the stream in the background."""
+        if not self.is_running:
+            self._task = asyncio.ensure_future(self._async_read())
+
+    async def async_stop(self) -> None:
+        """Stop reading the stream."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _async_read(self) -> None:
+        """Follow the titles, clear the title when the reader stops."""
+        try:
+            await self._async_read_titles()
+        finally:
+            if self._title is not None:
+                self._title = None
+                if self._callback is not None:
+                    self._callback(None)
+
+    async def _async_read_titles(self) -> None:
+        """Skip the audio, parse every metadata block until the budget is used up."""
+        budget = self._read_budget
+        try:
+            async with self._session.get(
+                self._url,
+                headers={"Icy-MetaData": "1"},
+                timeout=aiohttp.ClientTimeout(sock_connect=HEAD_TIMEOUT, sock_read=30),
+            ) as response:
+                try:
+                    metaint = int(response.headers["icy-metaint"])
+                except (KeyError, ValueError):
+                    LOGGER.debug("Stream %s: no in-band metadata", self._url)
+                    return
+
+                while budget > metaint:
+                    await response.content.readexactly(metaint)
+                    length = (await response.content.readexactly(1))[0] * 16
+                    budget -= metaint + 1 + length
+                    if length == 0:
+                        continue
+                    title = parse_stream_title(await response.content.readexactly(length))
+                    if title is not None and title != self._title:
+                        self._title = title
+                        if self._callback is not None:
+                            self._callback(title)
+        except (aiohttp.ClientError, asyncio.TimeoutError, asyncio.IncompleteReadError) as err:
+            LOGGER.debug("Stream %s: metadata read stopped %s", self._url, repr(err))
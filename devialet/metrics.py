@@ -0,0 +1,120 @@
+"""Request instrumentation for the Devialet integration."""
+from __future__ import annotations
+
+from bisect import bisect_left
+from typing import Callable, NamedTuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 5)
+
+
+class MetricSample(NamedTuple):
+    """A single measured request or update cycle, as passed to the export hook."""
+
+    host: str
+    endpoint: str
+    latency: float
+    bytes_received: int
+    error: str | None
+
+
+class LatencyStats:
+    """Counts, errors and a latency histogram of one endpoint."""
+
+    __slots__ = (
+        "count",
+        "unchanged",
+        "bytes_received",
+        "latency_sum",
+        "latency_max",
+        "histogram",
+        "errors",
+    )
+
+    def __init__(self):
+        """Initialize the statistics."""
+        self.count = 0
+        self.unchanged = 0
+        self.bytes_received = 0
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+        self.histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.errors = {}
+
+    def record(self, latency: float, bytes_received: int = 0, error: str | None = None) -> None:
+        """Add a measurement."""
+        self.count += 1
+        self.bytes_received += bytes_received
+        self.latency_sum += latency
+        self.latency_max = max(self.latency_max, latency)
+        self.histogram[bisect_left(LATENCY_BUCKETS, latency)] += 1
+        if error is not None:
+            self.errors[error] = self.errors.get(error, 0) + 1
+
+    def as_dict(self) -> dict:
+        """Return the statistics as a dict."""
+        return {
+            "count": self.count,
+            "unchanged": self.unchanged,
+            "bytes_received": self.bytes_received,
+            "latency_avg": self.latency_sum / self.count if self.count else None,
+            "latency_max": self.latency_max,
+            "histogram": dict(zip([*map(str, LATENCY_BUCKETS), "+Inf"], self.histogram)),
+            "errors": dict(self.errors),
+        }
+
+
+class DevialetMetrics:
+    """Metrics of the requests to one host and of its update cycles."""
+
+    def __init__(self, host: str, hook: Callable[[MetricSample], None] | None = None):
+        """Initialize the metrics, the hook receives every sample for export."""
+        self._host = host
+        self._hook = hook
+        self._endpoints = {}
+        self._updates = LatencyStats()
+
+    @property
+    def requests(self) -> int:
+        """Return the total number of requests."""
+        return sum(stats.count for stats in self._endpoints.values())
+
+    @property
+    def endpoints(self) -> dict:
+        """Return the statistics by endpoint."""
+        return dict(self._endpoints)
+
+    @property
+    def updates(self) -> LatencyStats:
+        """Return the statistics of the update cycles."""
+        return self._updates
+
+    def record_request(
+        self,
+        endpoint: str,
+        latency: float,
+        bytes_received: int = 0,
+        error: str | None = None,
+        unchanged: bool = False,
+    ) -> None:
+        """Add a request measurement."""
+        stats = self._endpoints.get(endpoint)
+        if stats is None:
+            stats = self._endpoints[endpoint] = LatencyStats()
+        stats.record(latency, bytes_received, error)
+        if unchanged:
+            stats.unchanged += 1
+        if self._hook is not None:
+            self._hook(MetricSample(self._host, endpoint, latency, bytes_received, error))
+
+    def record_update(self, latency: float) -> None:
+        """Add an update cycle measurement."""
+        self._updates.record(latency)
+        if self._hook is not None:
+            self._hook(MetricSample(self._host, "update", latency, 0, None))
+
+    def as_dict(self) -> dict:
+        """Return all metrics as a dict."""
+        return {
+            "updates": self._updates.as_dict(),
+            "endpoints": {endpoint: stats.as_dict() for endpoint, stats in self._endpoints.items()},
+        }
@@ -0,0 +1,148 @@
+"""Per host request queue for the Devialet integration."""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+from typing import Awaitable, Callable
+
+# The polls of a concurrent update and one slot for commands
+MAX_IN_FLIGHT_REQUESTS = 4
+
+PRIORITY_COMMAND = 0
+PRIORITY_POLL = 1
+
+
+class _QueuedRequest:
+    """A request waiting for a free slot and the callers sharing it."""
+
+    __slots__ = ("send", "priority", "key", "future", "waiters", "task", "cancelled")
+
+    def __init__(self, send: Callable[[], Awaitable[any]], priority: int, key: any):
+        """Initialize the queued request."""
+        self.send = send
+        self.priority = priority
+        self.key = key
+        self.future = asyncio.get_running_loop().create_future()
+        self.waiters = 1
+        self.task: asyncio.Task | None = None
+        self.cancelled = False
+
+
+class RequestQueue:
+    """Bound the requests in flight to one host, commands go before polls.
+
+    One slot is kept free for commands, so a button press never waits for a
+    poll to finish. A poll that is still queued is shared with newer polls of
+    the same key instead of sending the same request twice.
+    """
+
+    def __init__(self, max_in_flight: int = MAX_IN_FLIGHT_REQUESTS):
+        """Initialize the queue."""
+        self._max_in_flight = max_in_flight
+        self._in_flight = 0
+        self._heap = []
+        self._queued = {}
+        self._counter = itertools.count()
+
+    @property
+    def in_flight(self) -> int:
+        """Return the number of requests being sent."""
+        return self._in_flight
+
+    @property
+    def queued(self) -> int:
+        """Return the number of requests waiting for a slot."""
+        return sum(1 for _, _, request in self._heap if not request.cancelled)
+
+    async def async_run(
+        self, send: Callable[[], Awaitable[any]], priority: int = PRIORITY_POLL, key: any = None
+    ) -> any:
+        """Send a request when a slot is free, return its result."""
+        if key is not None:
+            request = self._queued.get(key)
+            if request is not None:
+                request.waiters += 1
+                return await self._async_wait(request)
+
+        if not self._is_blocked(priority):
+            self._in_flight += 1
+            try:
+                return await send()
+            finally:
+                self._release()
+
+        request = _QueuedRequest(send, priority, key)
+        heapq.heappush(self._heap, (priority, next(self._counter), request))
+        if key is not None:
+            self._queued[key] = request
+        return await self._async_wait(request)
+
+    def _limit(self, priority: int) -> int:
+        """Return the number of slots a priority may use."""
+        if priority == PRIORITY_COMMAND or self._max_in_flight < 2:
+            return self._max_in_flight
+        return self._max_in_flight - 1
+
+    def _is_blocked(self, priority: int) -> bool:
+        """Return True when a new request of a priority has to wait."""
+        self._prune()
+        if self._heap and self._heap[0][0] <= priority:
+            return True
+        return self._in_flight >= self._limit(priority)
+
+    def _prune(self) -> None:
+        """Drop cancelled requests from the head of the queue."""
+        while self._heap and self._heap[0][2].cancelled:
+            heapq.heappop(self._heap)
+
+    def _release(self) -> None:
+        """Free a slot, start the queued requests that fit."""
+        self._in_flight -= 1
+        self._prune()
+        while self._heap and self._in_flight < self._limit(self._heap[0][0]):
+            _, _, request = heapq.heappop(self._heap)
+            if self._queued.get(request.key) is request:
+                del self._queued[request.key]
+            self._in_flight += 1
+            request.task = asyncio.ensure_future(self._async_send(request))
+            # A task cancelled before it started never runs its finally clause
+            request.task.add_done_callback(lambda task, request=request: self._on_sent(request))
+            self._prune()
+
+    async def _async_send(self, request: _QueuedRequest) -> None:
+        """Send a queued request, hand the result to its callers."""
+        try:
+            result = await request.send()
+        except asyncio.CancelledError:
+            request.future.cancel()
+            raise
+        except Exception as err:  # pylint: disable=broad-except
+            if not request.future.done():
+                request.future.set_exception(err)
+        else:
+            if not request.future.done():
+                request.future.set_result(result)
+
+    def _on_sent(self, request: _QueuedRequest) -> None:
+        """Free the slot of a queued request once its task is done."""
+        if not request.future.done():
+            request.future.cancel()
+        self._release()
+
+    async def _async_wait(self, request: _QueuedRequest) -> any:
+        """Wait for a queued request, drop it when no caller is left."""
+        try:
+            return await asyncio.shield(request.future)
+        except asyncio.CancelledError:
+            if request.future.cancelled() or request.future.done():
+                raise
+            request.waiters -= 1
+            if request.waiters == 0:
+                if request.task is not None:
+                    request.task.cancel()
+                else:
+                    request.cancelled = True
+                    if self._queued.get(request.key) is request:
+                        del self._queued[request.key]
+            raise
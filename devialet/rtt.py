@@ -0,0 +1,115 @@
+"""Round trip time estimation for the Devialet integration."""
+from __future__ import annotations
+
+import math
+import time
+from collections import deque
+from typing import Callable
+
+INITIAL_TIMEOUT = 2
+MIN_TIMEOUT = 0.3
+# Only a device that answered recently is waited on longer than the initial timeout
+MAX_TIMEOUT = 8
+SAMPLE_COUNT = 64
+# Hedging needs a meaningful p95 first
+MIN_HEDGE_SAMPLES = 20
+
+# The gains of RFC 6298
+RTT_ALPHA = 1 / 8
+RTT_BETA = 1 / 4
+RTT_K = 4
+
+
+class RttEstimator:
+    """Smoothed round trip time and variance of a host, like TCP, to derive timeouts."""
+
+    def __init__(
+        self,
+        initial_timeout: float = INITIAL_TIMEOUT,
+        min_timeout: float = MIN_TIMEOUT,
+        max_timeout: float = MAX_TIMEOUT,
+        sample_count: int = SAMPLE_COUNT,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initialize the estimator, the initial timeout is used until the first sample."""
+        self._initial_timeout = initial_timeout
+        self._min_timeout = min_timeout
+        self._max_timeout = max_timeout
+        self._srtt: float | None = None
+        self._rttvar: float | None = None
+        self._timeout = initial_timeout
+        self._samples = deque(maxlen=sample_count)
+        self._clock = clock
+        self._answered_at: float | None = None
+
+    @property
+    def srtt(self) -> float | None:
+        """Return the smoothed round trip time."""
+        return self._srtt
+
+    @property
+    def rttvar(self) -> float | None:
+        """Return the round trip time variance."""
+        return self._rttvar
+
+    @property
+    def timeout(self) -> float:
+        """Return the timeout of the next request."""
+        return self._timeout
+
+    @property
+    def initial_timeout(self) -> float:
+        """Return the timeout before the first sample, the cap of an unanswering host."""
+        return self._initial_timeout
+
+    @property
+    def max_timeout(self) -> float:
+        """Return the longest timeout."""
+        return self._max_timeout
+
+    @property
+    def command_timeout(self) -> float:
+        """Return the timeout of a command, at least the initial one.
+
+        Commands like a power off take a while on the device and are not retried.
+        """
+        return max(self._timeout, self._initial_timeout)
+
+    @property
+    def p95(self) -> float | None:
+        """Return the 95th percentile of the recent round trip times, None without enough samples."""
+        if len(self._samples) < MIN_HEDGE_SAMPLES:
+            return None
+        samples = sorted(self._samples)
+        return samples[math.ceil(len(samples) * 0.95) - 1]
+
+    def answered_within(self, seconds: float) -> bool:
+        """Return True when a request succeeded in the last seconds."""
+        return self._answered_at is not None and self._clock() - self._answered_at < seconds
+
+    def record(self, rtt: float) -> None:
+        """Add the round trip time of a successful request."""
+        self._answered_at = self._clock()
+        self._samples.append(rtt)
+        if self._srtt is None:
+            self._srtt = rtt
+            self._rttvar = rtt / 2
+        else:
+            self._rttvar = (1 - RTT_BETA) * self._rttvar + RTT_BETA * abs(self._srtt - rtt)
+            self._srtt = (1 - RTT_ALPHA) * self._srtt + RTT_ALPHA * rtt
+        self._timeout = min(
+            max(self._srtt + RTT_K * self._rttvar, self._min_timeout), self._max_timeout
+        )
+
+    def record_timeout(self) -> None:
+        """Back off after a timeout, the next sample restores the estimate."""
+        self._timeout = min(self._timeout * 2, self._max_timeout)
+
+    def as_dict(self) -> dict:
+        """Return the estimate as a dict."""
+        return {
+            "srtt": self._srtt,
+            "rttvar": self._rttvar,
+            "timeout": self._timeout,
+            "p95": self.p95,
+        }
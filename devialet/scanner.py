@@ -0,0 +1,252 @@
+"""LAN discovery of Devialet devices."""
+from __future__ import annotations
+
+import asyncio
+import ipaddress
+from typing import NamedTuple
+
+import aiohttp
+
+from .const import LOGGER, MEDIA_RENDERER, UrlSuffix
+from .decoder import get_json_decoder
+from .state import parse_general_info
+
+DEFAULT_PORT = 80
+SCAN_TIMEOUT = 5
+PROBE_TIMEOUT = 1
+MAX_CONCURRENT_PROBES = 64
+MDNS_SERVICE = "_devialet-http._tcp.local."
+
+
+class DiscoveredDevice(NamedTuple):
+    """A device that answered the general info request."""
+
+    host: str
+    device_id: str
+    device_name: str | None
+    model: str | None
+    serial: str | None
+    system_id: str | None
+    group_id: str | None
+    is_system_leader: bool | None
+    found_by: frozenset
+
+
+class DiscoveredSystem(NamedTuple):
+    """The devices of one system, like a stereo pair."""
+
+    system_id: str
+    leader: DiscoveredDevice | None
+    devices: tuple
+
+
+def format_host(address: str, port: int) -> str:
+    """Return the host string of DevialetApi for an address and port."""
+    if ":" in address:
+        address = f"[{address}]"
+    if port == DEFAULT_PORT:
+        return address
+    return f"{address}:{port}"
+
+
+class DevialetScanner:
+    """Find the devices on the LAN with SSDP, mDNS and an optional subnet probe.
+
+    Every address found is confirmed with the general info request, so only
+    Devialet devices are reported, once per deviceId.
+    """
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        timeout: float = SCAN_TIMEOUT,
+        subnets: list | None = None,
+        port: int = DEFAULT_PORT,
+        probe_timeout: float = PROBE_TIMEOUT,
+        max_concurrent_probes: int = MAX_CONCURRENT_PROBES,
+        ssdp: bool = True,
+        ssdp_target: tuple | None = None,
+        mdns: bool = True,
+        zeroconf: any = None,
+    ):
+        """Initialize the scanner, subnets like 192.168.1.0/24 are probed address by address.
+
+        A running AsyncZeroconf instance can be shared through zeroconf.
+        """
+        self._session = session
+        self._timeout = timeout
+        self._subnets = subnets or []
+        self._port = port
+        self._probe_timeout = probe_timeout
+        self._max_concurrent_probes = max_concurrent_probes
+        self._semaphore = asyncio.Semaphore(max_concurrent_probes)
+        self._ssdp = ssdp
+        self._ssdp_target = ssdp_target
+        self._mdns = mdns
+        self._zeroconf = zeroconf
+        self._json_decoder = get_json_decoder()
+        self._probes = {}
+        self._devices = {}
+
+    @property
+    def devices(self) -> list:
+        """Return the devices found so far."""
+        return list(self._devices.values())
+
+    async def async_scan(self) -> list:
+        """Scan the LAN, return the systems found, each with its leader first."""
+        listeners = []
+        if self._ssdp:
+            listeners.append(self._async_search_ssdp())
+        if self._mdns:
+            listeners.append(self._async_browse_mdns())
+        for subnet in self._subnets:
+            listeners.append(self._async_probe_subnet(subnet))
+
+        await asyncio.gather(*listeners)
+        # Addresses found at the end of the scan are still confirmed
+        await asyncio.gather(*self._probes.values())
+        return self.systems()
+
+    def systems(self) -> list:
+        """Return the devices found so far by system."""
+        devices_by_system = {}
+        for device in self._devices.values():
+            devices_by_system.setdefault(device.system_id or device.device_id, []).append(device)
+
+        systems = []
+        for system_id, devices in devices_by_system.items():
+            devices.sort(key=lambda device: (not device.is_system_leader, device.host))
+            leader = devices[0] if devices[0].is_system_leader else None
+            systems.append(DiscoveredSystem(system_id, leader, tuple(devices)))
+        return sorted(systems, key=lambda system: system.devices[0].device_name or "")
+
+    def _on_address(self, address: str, port: int, found_by: str) -> asyncio.Task:
+        """Confirm an address once, every source adds itself to the device."""
+        host = format_host(address, port)
+        probe = self._probes.get(host)
+        if probe is None:
+            probe = self._probes[host] = asyncio.ensure_future(self._async_probe(host))
+        probe.add_done_callback(lambda task: self._add_source(task, found_by))
+        return probe
+
+    def _add_source(self, probe: asyncio.Task, found_by: str) -> None:
+        """Add the source of an address to the device behind it."""
+        if probe.cancelled() or probe.exception() is not None or probe.result() is None:
+            return
+        device = self._devices[probe.result()]
+        if found_by not in device.found_by:
+            self._devices[device.device_id] = device._replace(
+                found_by=device.found_by | {found_by}
+            )
+
+    async def _async_probe(self, host: str) -> str | None:
+        """Request the general info of a host, return its deviceId."""
+        async with self._semaphore:
+            try:
+                async with self._session.get(
+                    url="http://" + host + UrlSuffix.GET_GENERAL_INFO.value,
+                    allow_redirects=False,
+                    timeout=aiohttp.ClientTimeout(total=self._probe_timeout),
+                ) as response:
+                    if response.status != 200:
+                        return None
+                    general_info = parse_general_info(self._json_decoder(await response.read()))
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError, TypeError):
+                return None
+
+        device_id = general_info["device_id"]
+        if not isinstance(device_id, str):
+            return None
+        # A device with several addresses keeps the first one that answered
+        if device_id not in self._devices:
+            LOGGER.debug("Found %s at %s", general_info["device_name"], host)
+            self._devices[device_id] = DiscoveredDevice(
+                host=host,
+                device_id=device_id,
+                device_name=general_info["device_name"],
+                model=general_info["model"],
+                serial=general_info["serial"],
+                system_id=general_info["system_id"],
+                group_id=general_info["group_id"],
+                is_system_leader=general_info["is_system_leader"],
+                found_by=frozenset(),
+            )
+        return device_id
+
+    async def _async_probe_subnet(self, subnet: str) -> None:
+        """Probe every address of a subnet, bounded by max_concurrent_probes."""
+        try:
+            addresses = iter(ipaddress.ip_network(subnet, strict=False).hosts())
+        except ValueError as err:
+            LOGGER.debug("Invalid subnet %s %s", subnet, repr(err))
+            return
+
+        # The workers share the iterator, large subnets are not queued up front
+        async def _async_worker() -> None:
+            for address in addresses:
+                await self._on_address(str(address), self._port, "probe")
+
+        await asyncio.gather(*(_async_worker() for _ in range(self._max_concurrent_probes)))
+
+    async def _async_search_ssdp(self) -> None:
+        """Search for media renderers, their locations are cached for the UPnP lookup."""
+        # pylint: disable=import-outside-toplevel
+        from async_upnp_client.search import async_search
+
+        from .discovery import get_discovery_registry
+
+        registry = get_discovery_registry()
+
+        async def _async_on_response(data: any) -> None:
+            address = registry.record(data)
+            if address is not None:
+                self._on_address(address, self._port, "ssdp")
+
+        try:
+            await async_search(
+                async_callback=_async_on_response,
+                timeout=self._timeout,
+                search_target=MEDIA_RENDERER,
+                source=("0.0.0.0", 0),
+                target=self._ssdp_target,
+            )
+        except OSError as err:
+            LOGGER.debug("SSDP search failed %s", repr(err))
+
+    async def _async_browse_mdns(self) -> None:
+        """Browse the Devialet HTTP service, when zeroconf is installed."""
+        # pylint: disable=import-outside-toplevel
+        try:
+            from zeroconf import ServiceStateChange
+            from zeroconf.asyncio import AsyncServiceBrowser, AsyncServiceInfo, AsyncZeroconf
+        except ImportError:
+            LOGGER.debug("zeroconf is not installed, skipping mDNS")
+            return
+
+        aiozc = self._zeroconf or AsyncZeroconf()
+        resolvers = []
+
+        async def _async_resolve(service_type: str, name: str) -> None:
+            info = AsyncServiceInfo(service_type, name)
+            if not await info.async_request(aiozc.zeroconf, int(self._timeout * 1000)):
+                return
+            for address in info.parsed_addresses():
+                self._on_address(address, info.port or DEFAULT_PORT, "mdns")
+
+        def _on_service_state_change(
+            zeroconf: any, service_type: str, name: str, state_change: ServiceStateChange
+        ) -> None:
+            if state_change is ServiceStateChange.Added:
+                resolvers.append(asyncio.ensure_future(_async_resolve(service_type, name)))
+
+        browser = AsyncServiceBrowser(
+            aiozc.zeroconf, [MDNS_SERVICE], handlers=[_on_service_state_change]
+        )
+        try:
+            await asyncio.sleep(self._timeout)
+            await asyncio.gather(*resolvers)
+        finally:
+            await browser.async_cancel()
+            if self._zeroconf is None:
+                await aiozc.async_close()
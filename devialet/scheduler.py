@@ -0,0 +1,100 @@
+"""Adaptive polling scheduler for the Devialet integration."""
+from __future__ import annotations
+
+import time
+from typing import Callable, NamedTuple
+
+from .const import UrlSuffix
+
+BOOST_DURATION = 15
+
+
+class PollInterval(NamedTuple):
+    """Refresh intervals in seconds of a polling tier."""
+
+    boost: float
+    normal: float
+    idle: float
+
+
+FAST = PollInterval(boost=1, normal=2, idle=10)
+MEDIUM = PollInterval(boost=2, normal=10, idle=30)
+SLOW = PollInterval(boost=10, normal=60, idle=300)
+
+ENDPOINT_TIERS = {
+    UrlSuffix.GET_CURRENT_SOURCE: FAST,
+    UrlSuffix.GET_VOLUME: MEDIUM,
+    UrlSuffix.GET_EQUALIZER: SLOW,
+    UrlSuffix.GET_NIGHT_MODE: SLOW,
+    UrlSuffix.GET_SOURCES: SLOW,
+    UrlSuffix.GET_GENERAL_INFO: SLOW,
+}
+
+
+class PollScheduler:
+    """Keep track of when each endpoint has to be refreshed."""
+
+    def __init__(
+        self,
+        tiers: dict | None = None,
+        boost_duration: float = BOOST_DURATION,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initialize the scheduler."""
+        self._tiers = dict(ENDPOINT_TIERS if tiers is None else tiers)
+        self._boost_duration = boost_duration
+        self._clock = clock
+        self._last_polled = {}
+        self._boost_until = 0.0
+        self._idle = False
+
+    @property
+    def is_boosted(self) -> bool:
+        """Return True while the fast intervals are in use."""
+        return self._clock() < self._boost_until
+
+    @property
+    def is_idle(self) -> bool:
+        """Return True when the device is idle, paused or off."""
+        return self._idle
+
+    def interval(self, suffix: UrlSuffix) -> float:
+        """Return the current refresh interval of an endpoint."""
+        tier = self._tiers[suffix]
+        if self.is_boosted:
+            return tier.boost
+        if self._idle:
+            return tier.idle
+        return tier.normal
+
+    def is_due(self, suffix: UrlSuffix) -> bool:
+        """Return True when an endpoint has to be refreshed."""
+        last_polled = self._last_polled.get(suffix)
+        if last_polled is None:
+            return True
+        return self._clock() - last_polled >= self.interval(suffix)
+
+    def next_due(self, suffixes: list | None = None) -> float:
+        """Return the number of seconds until the next endpoint is due."""
+        now = self._clock()
+        remaining = [
+            self._last_polled[suffix] + self.interval(suffix) - now
+            if suffix in self._last_polled
+            else 0
+            for suffix in (self._tiers if suffixes is None else suffixes)
+        ]
+        return max(min(remaining), 0)
+
+    def mark_polled(self, suffix: UrlSuffix, changed: bool = False) -> None:
+        """Register a refresh of an endpoint, boost when the data changed."""
+        self._last_polled[suffix] = self._clock()
+        if changed:
+            self.boost()
+
+    def boost(self) -> None:
+        """Use the fast intervals for a while, after a command or a change."""
+        self._boost_until = self._clock() + self._boost_duration
+
+    def set_idle(self, idle: bool) -> None:
+        """Slow down when the device is idle, paused or off."""
+        self._idle = idle
@@ -0,0 +1,92 @@
+"""State snapshot of a Devialet device."""
+from __future__ import annotations
+
+from typing import NamedTuple
+
+
+class DevialetState(NamedTuple):
+    """Fields exposed by the API, parsed once per update."""
+
+    device_id: str | None = None
+    is_system_leader: bool | None = None
+    group_id: str | None = None
+    system_id: str | None = None
+    serial: str | None = None
+    device_name: str | None = None
+    device_role: str | None = None
+    model: str | None = None
+    version: str | None = None
+    playing_state: str | None = None
+    is_volume_muted: bool | None = None
+    available_operations: any | None = None
+    media_artist: str | None = None
+    media_album_name: str | None = None
+    media_title: str | None = None
+    media_image_url: str | None = None
+    source_id: str | None = None
+    source_device_id: str | None = None
+    volume_level: float | None = None
+    night_mode: bool | None = None
+    equalizer: str | None = None
+
+
+def _get(data: any, *keys: str) -> any | None:
+    """Return a nested value of a response, None when it is missing."""
+    try:
+        for key in keys:
+            data = data[key]
+        return data
+    except (KeyError, TypeError):
+        return None
+
+
+def parse_general_info(data: any) -> dict:
+    """Return the state fields of the general info response."""
+    return {
+        "device_id": _get(data, "deviceId"),
+        "is_system_leader": _get(data, "isSystemLeader"),
+        "group_id": _get(data, "groupId"),
+        "system_id": _get(data, "systemId"),
+        "serial": _get(data, "serial"),
+        "device_name": _get(data, "deviceName"),
+        "device_role": _get(data, "role"),
+        "model": _get(data, "model"),
+        "version": _get(data, "release", "version"),
+    }
+
+
+def parse_source_state(data: any) -> dict:
+    """Return the state fields of the current source response."""
+    mute_state = _get(data, "muteState")
+    return {
+        "playing_state": _get(data, "playingState"),
+        "is_volume_muted": None if mute_state is None else mute_state == "muted",
+        "available_operations": _get(data, "availableOperations"),
+        "media_artist": _get(data, "metadata", "artist"),
+        "media_album_name": _get(data, "metadata", "album"),
+        "media_title": _get(data, "metadata", "title"),
+        "media_image_url": _get(data, "metadata", "coverArtUrl"),
+        "source_id": _get(data, "source", "sourceId"),
+        "source_device_id": _get(data, "source", "deviceId"),
+    }
+
+
+def parse_volume(data: any) -> dict:
+    """Return the state fields of the volume response."""
+    volume = _get(data, "volume")
+    try:
+        return {"volume_level": volume * 0.01}
+    except TypeError:
+        return {"volume_level": None}
+
+
+def parse_night_mode(data: any) -> dict:
+    """Return the state fields of the night mode response."""
+    night_mode = _get(data, "nightMode")
+    return {"night_mode": None if night_mode is None else night_mode == "on"}
+
+
+def parse_equalizer(data: any) -> dict:
+    """Return the state fields of the equalizer response."""
+    preset = _get(data, "preset") if _get(data, "enabled") else None
+    return {"equalizer": preset}
@@ -0,0 +1,167 @@
+"""Streaming state changes of a Devialet device."""
+from __future__ import annotations
+
+import asyncio
+from enum import Enum
+from typing import TYPE_CHECKING, AsyncIterator, NamedTuple
+
+from .const import LOGGER
+
+if TYPE_CHECKING:
+    from .devialet_api import DevialetApi
+
+WATCH_INTERVAL = 5
+
+
+class ChangeKind(Enum):
+    """Parts of the device state that a watcher reports."""
+
+    AVAILABILITY = "availability"
+    TRACK = "track"
+    PLAYING_STATE = "playing_state"
+    VOLUME = "volume"
+    MUTE = "mute"
+    SOURCE = "source"
+    NIGHT_MODE = "night_mode"
+    EQUALIZER = "equalizer"
+
+
+class Track(NamedTuple):
+    """Metadata of the current track."""
+
+    title: str | None
+    artist: str | None
+    album: str | None
+    image_url: str | None
+    duration: int | None
+
+
+class ChangeEvent(NamedTuple):
+    """A changed part of the state, previous is the value the subscriber saw last."""
+
+    kind: ChangeKind
+    value: any
+    previous: any
+
+
+def snapshot(api: DevialetApi) -> dict:
+    """Return the watched values of a device by kind."""
+    return {
+        ChangeKind.AVAILABILITY: api.is_available,
+        ChangeKind.TRACK: Track(
+            api.media_title,
+            api.media_artist,
+            api.media_album_name,
+            api.media_image_url,
+            api.media_duration,
+        ),
+        ChangeKind.PLAYING_STATE: api.playing_state,
+        ChangeKind.VOLUME: api.volume_level,
+        ChangeKind.MUTE: api.is_volume_muted,
+        ChangeKind.SOURCE: api.source,
+        ChangeKind.NIGHT_MODE: api.night_mode,
+        ChangeKind.EQUALIZER: api.equalizer,
+    }
+
+
+class _Subscription:
+    """Changes a subscriber did not read yet, at most one per kind."""
+
+    __slots__ = ("interval", "changes", "event")
+
+    def __init__(self, interval: float | None):
+        """Initialize the subscription."""
+        self.interval = interval
+        self.changes = {}
+        self.event = asyncio.Event()
+
+    def put(self, change: ChangeEvent) -> None:
+        """Add a change, fold it into an unread change of the same kind."""
+        unread = self.changes.get(change.kind)
+        if unread is not None:
+            if change.value == unread.previous:
+                # Changed back before the subscriber noticed
+                del self.changes[change.kind]
+                if not self.changes:
+                    self.event.clear()
+                return
+            change = change._replace(previous=unread.previous)
+        self.changes[change.kind] = change
+        self.event.set()
+
+    async def async_get(self) -> ChangeEvent:
+        """Return the oldest unread change."""
+        while not self.changes:
+            await self.event.wait()
+            self.event.clear()
+        kind = next(iter(self.changes))
+        return self.changes.pop(kind)
+
+
+class StateWatcher:
+    """Diff the state of a device after every change, one poll loop for all subscribers."""
+
+    def __init__(self, api: DevialetApi):
+        """Initialize the watcher."""
+        self._api = api
+        self._snapshot = snapshot(api)
+        self._subscriptions = set()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def subscribers(self) -> int:
+        """Return the number of subscribers."""
+        return len(self._subscriptions)
+
+    def publish(self) -> None:
+        """Send the changes since the previous snapshot to every subscriber."""
+        if not self._subscriptions:
+            return
+        current = snapshot(self._api)
+        for kind, value in current.items():
+            previous = self._snapshot[kind]
+            if value != previous:
+                change = ChangeEvent(kind, value, previous)
+                for subscription in self._subscriptions:
+                    subscription.put(change)
+        self._snapshot = current
+
+    async def watch(
+        self, interval: float | None = WATCH_INTERVAL, initial: bool = True
+    ) -> AsyncIterator[ChangeEvent]:
+        """Yield the changes of the device, see DevialetApi.watch."""
+        if not self._subscriptions:
+            self._snapshot = snapshot(self._api)
+        subscription = _Subscription(interval)
+        if initial:
+            # Values that are not known yet follow as changes
+            for kind, value in self._snapshot.items():
+                if value is not None:
+                    subscription.put(ChangeEvent(kind, value, None))
+        self._subscriptions.add(subscription)
+        if interval is not None and self._task is None:
+            self._task = asyncio.ensure_future(self._async_poll())
+        try:
+            while True:
+                yield await subscription.async_get()
+        finally:
+            self._subscriptions.discard(subscription)
+            if self._task is not None and not any(
+                other.interval is not None for other in self._subscriptions
+            ):
+                self._task.cancel()
+                self._task = None
+
+    async def _async_poll(self) -> None:
+        """Update the device at the shortest interval of the subscribers."""
+        while True:
+            try:
+                await self._api.async_update()
+            except Exception as err:  # pylint: disable=broad-except
+                LOGGER.debug("Watch update failed %s", repr(err))
+            intervals = [
+                subscription.interval
+                for subscription in self._subscriptions
+                if subscription.interval is not None
+            ]
+            await asyncio.sleep(min(intervals, default=WATCH_INTERVAL))
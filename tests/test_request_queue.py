@@ -0,0 +1,98 @@
+"""Tests of the request queue and the command coalescer."""
+from __future__ import annotations
+
+import asyncio
+
+from devialet.coalescer import CommandCoalescer
+from devialet.request_queue import PRIORITY_COMMAND, PRIORITY_POLL, RequestQueue
+
+
+def test_cancelled_queued_request_frees_its_slot():
+    """A request cancelled while it waits for a slot does not keep one."""
+
+    async def _async_test():
+        queue = RequestQueue(1)
+        release = asyncio.Event()
+        queued = []
+
+        async def _async_running():
+            await release.wait()
+            # Cancelled in the step that hands the slot to the queued request
+            queued[0].cancel()
+
+        async def _async_queued():
+            return "queued"
+
+        running = asyncio.ensure_future(queue.async_run(_async_running))
+        await asyncio.sleep(0)
+        queued.append(asyncio.ensure_future(queue.async_run(_async_queued)))
+        await asyncio.sleep(0)
+        assert queue.in_flight == 1
+        assert queue.queued == 1
+
+        release.set()
+        await running
+        await asyncio.gather(queued[0], return_exceptions=True)
+        await asyncio.sleep(0)
+        assert queued[0].cancelled()
+        assert queue.in_flight == 0
+
+        async def _async_ok():
+            return "ok"
+
+        assert await asyncio.wait_for(queue.async_run(_async_ok), 1) == "ok"
+
+    asyncio.run(_async_test())
+
+
+def test_commands_overtake_queued_polls():
+    """A command is sent before the polls that were queued earlier."""
+
+    async def _async_test():
+        queue = RequestQueue(2)
+        release = asyncio.Event()
+        sent = []
+
+        def _send(name: str):
+            async def _async_send():
+                sent.append(name)
+                await release.wait()
+
+            return _async_send
+
+        running = asyncio.ensure_future(queue.async_run(_send("running")))
+        await asyncio.sleep(0)
+        poll = asyncio.ensure_future(queue.async_run(_send("poll"), PRIORITY_POLL))
+        await asyncio.sleep(0)
+        command = asyncio.ensure_future(queue.async_run(_send("command"), PRIORITY_COMMAND))
+        await asyncio.sleep(0)
+
+        # The command takes the slot kept free for commands, the poll waits
+        assert sent == ["running", "command"]
+        release.set()
+        await asyncio.gather(running, poll, command)
+        assert sent == ["running", "command", "poll"]
+
+    asyncio.run(_async_test())
+
+
+def test_coalescer_pending_while_sending():
+    """The coalesced value stays pending until its request is done."""
+
+    async def _async_test():
+        coalescer = CommandCoalescer(0)
+        release = asyncio.Event()
+
+        async def _async_send(value: float):
+            await release.wait()
+            return True
+
+        submit = asyncio.ensure_future(coalescer.async_submit("volume", 0.5, _async_send))
+        await asyncio.sleep(0.01)
+        assert coalescer.pending("volume") == 0.5
+
+        release.set()
+        assert await submit
+        assert coalescer.pending("volume") is None
+
+    asyncio.run(_async_test())